@@ -17,6 +17,7 @@ from .ex.relational.definition.exdschema import SchemaSheet
 from .ex.relational.definition import RelationDefinition, SheetDefinition
 from .xiv import XivCollection
 from .pack import PackCollection
+from .storage import LooseFileStorage
 from .indexfile import Directory
 from .file import File
 
@@ -56,9 +57,15 @@ class ARealmReversed(object):
     def is_current_version(self):
         return self.game_version == self.definition_version
 
-    def __init__(self, game_path: str, language: Language):
+    def __init__(self, game_path: str, language: Language, index_cache_dir: str = None, overlay_dir: str = None,
+                 spill_cache_dir: str = None):
         self._game_directory = Path(game_path)
-        self._packs = PackCollection(self._game_directory.joinpath("game", "sqpack"))
+        self._packs = PackCollection(
+            self._game_directory.joinpath("game", "sqpack"),
+            index_cache_dir=index_cache_dir,
+            spill_cache_dir=spill_cache_dir,
+            overlays=[LooseFileStorage(overlay_dir)] if overlay_dir is not None else None,
+        )
         self._game_data = XivCollection(self._packs)
         self._game_data.active_language = language
 
@@ -0,0 +1,56 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+DEFAULT_MAX_WORKERS = 8
+
+_executor = None  # type: ThreadPoolExecutor
+_executor_lock = Lock()
+_max_workers = DEFAULT_MAX_WORKERS
+_in_flight = {}  # type: Dict[Tuple[asyncio.AbstractEventLoop, Hashable], asyncio.Future]
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Get the executor shared by all coroutine APIs for blocking reads.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=_max_workers, thread_name_prefix='saintcoinach-aio')
+    return _executor
+
+
+def set_max_workers(max_workers: int):
+    """
+    Change the number of threads of the shared executor.
+
+    Work already submitted to the previous executor still completes.
+    """
+    global _executor, _max_workers
+    with _executor_lock:
+        _max_workers = max_workers
+        previous, _executor = _executor, None
+    if previous is not None:
+        previous.shutdown(wait=False)
+
+
+async def run(key: Hashable, func: Callable[..., Any], *args) -> Any:
+    """
+    Run a blocking call on the shared executor.
+
+    Concurrent calls with the same key on the same event loop share a single
+    execution of the call. Cancelling one caller doesn't cancel the call for
+    the others.
+    """
+    loop = asyncio.get_running_loop()
+    flight_key = (loop, key)
+    future = _in_flight.get(flight_key, None)
+    if future is None:
+        future = loop.run_in_executor(get_executor(), func, *args)
+        _in_flight[flight_key] = future
+        future.add_done_callback(lambda f: _in_flight.pop(flight_key, None))
+    return await asyncio.shield(future)
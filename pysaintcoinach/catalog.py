@@ -0,0 +1,313 @@
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple, Union
+import logging
+import mmap
+import struct
+import zlib
+
+from .file import FileType
+from .indexcache import pack_sections, unpack_sections
+from .indexfile import _UINT32
+from .pack import Pack, PackCollection, PackIdentifier
+
+
+logger = logging.getLogger(__name__)
+
+
+class Catalog(object):
+    """
+    Compact inventory of the files of one or more packs, built by reading
+    only the headers of the files.
+
+    Every file is a row of parallel arrays, ordered by pack, dat file and
+    offset. For packs with only an *.index2 file the directory key is 0 and
+    the file key is the hash of the full path.
+    """
+
+    MAGIC = b'SCCATLOG'
+    FORMAT_VERSION = 2
+
+    # Bytes read per file; enough for the common and image headers of most files.
+    PROBE_LENGTH = 0x400
+    # Number of rows each scan task reads in dat order.
+    SCAN_CHUNK_ROWS = 0x1000
+    # Size of the reads done while computing checksums.
+    CHECKSUM_READ_LENGTH = 0x100000
+    # Largest gap between two headers that are still hinted as one range.
+    SCAN_HINT_MAX_GAP = 0x4000
+
+    COLUMNS = (('packs', _UINT32),
+               ('dirkeys', _UINT32),
+               ('keys', _UINT32),
+               ('dats', 'B'),
+               ('offsets', 'Q'),
+               ('types', 'B'),
+               ('sizes', _UINT32),
+               ('blocks', _UINT32),
+               ('formats', 'H'),
+               ('widths', 'H'),
+               ('heights', 'H'),
+               ('crcs', _UINT32))
+
+    # Columns filled in from the headers of the files.
+    _HEADER_COLUMNS = ('types', 'sizes', 'blocks', 'formats', 'widths', 'heights', 'crcs')
+
+    @property
+    def game_version(self) -> str: return self._game_version
+
+    @property
+    def pack_keys(self):
+        """
+        Pack of every file, as `type << 16 | expansion << 8 | number`.
+        """
+        return self._columns['packs']
+
+    @property
+    def directory_keys(self): return self._columns['dirkeys']
+
+    @property
+    def file_keys(self): return self._columns['keys']
+
+    @property
+    def dat_files(self): return self._columns['dats']
+
+    @property
+    def offsets(self): return self._columns['offsets']
+
+    @property
+    def file_types(self): return self._columns['types']
+
+    @property
+    def raw_sizes(self): return self._columns['sizes']
+
+    @property
+    def block_counts(self):
+        """
+        Number of data blocks of every file; for textures, of all mipmaps.
+        """
+        return self._columns['blocks']
+
+    @property
+    def image_formats(self): return self._columns['formats']
+
+    @property
+    def widths(self): return self._columns['widths']
+
+    @property
+    def heights(self): return self._columns['heights']
+
+    @property
+    def checksums(self):
+        """
+        CRC-32 of the stored (still compressed) data of every file, or all
+        zeroes if the catalog was scanned without checksums.
+        """
+        return self._columns['crcs']
+
+    @property
+    def has_checksums(self) -> bool: return self._has_checksums
+
+    def __init__(self, columns: Dict[str, array], game_version: str = '', has_checksums: bool = False):
+        self._columns = columns
+        self._game_version = game_version
+        self._has_checksums = has_checksums
+        self._rows = None  # type: Dict[Tuple[int, int, int], int]
+
+    def __len__(self):
+        return len(self._columns['keys'])
+
+    def __getitem__(self, row: int) -> tuple:
+        return tuple(self._columns[name][row] for name, _ in self.COLUMNS)
+
+    def get_column(self, name: str):
+        """
+        Get a column by its name in `COLUMNS`.
+        """
+        return self._columns[name]
+
+    def get_pack_id(self, row: int) -> PackIdentifier:
+        pack_key = self.pack_keys[row]
+        return PackIdentifier(pack_key >> 16, (pack_key >> 8) & 0xFF, pack_key & 0xFF)
+
+    def find(self, pack_key: int, directory_key: int, file_key: int) -> Optional[int]:
+        """
+        Get the row of a file, or None if it isn't in the catalog.
+        """
+        if self._rows is None:
+            self._rows = dict(zip(zip(self.pack_keys, self.directory_keys, self.file_keys),
+                                  range(len(self))))
+        return self._rows.get((pack_key, directory_key, file_key), None)
+
+    def save(self, path: Union[str, Path]):
+        sections = dict(self._columns)
+        sections['version'] = array('B', self.game_version.encode())
+        sections['flags'] = array('B', [1 if self.has_checksums else 0])
+        Path(path).write_bytes(pack_sections(self.MAGIC, self.FORMAT_VERSION, sections))
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'Catalog':
+        with open(path, 'rb') as f:
+            view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        sections = unpack_sections(view, cls.MAGIC, cls.FORMAT_VERSION)
+        if sections is None:
+            raise ValueError('Not a catalog written by this version: %s' % path)
+        game_version = sections.pop('version').tobytes().decode()
+        has_checksums = sections.pop('flags')[0] != 0
+        return cls(sections, game_version, has_checksums)
+
+    @classmethod
+    def scan(cls,
+             packs: Union[PackCollection, Iterable[Pack]],
+             max_workers: int = None,
+             game_version: str = '',
+             checksums: bool = False) -> 'Catalog':
+        """
+        Build a catalog of every file of the given packs, or of every pack of
+        a collection.
+
+        Headers are read in dat-offset order, split into chunks that are
+        spread over a pool of `max_workers` threads. With `checksums`, the
+        stored data of every file is read as well (but not inflated) to
+        compute its checksum.
+        """
+        if isinstance(packs, PackCollection):
+            game_version = game_version or packs.game_version
+            packs = packs.get_all_packs()
+
+        columns = {name: array(type_code) for name, type_code in cls.COLUMNS}
+        chunks = []
+        for pack in packs:
+            table = pack.source.index.table
+            order = sorted(range(len(table)), key=lambda r: (table.dat_files[r], table.offsets[r]))
+            start = len(columns['keys'])
+            pack_key = hash(pack.id)
+            directory_keys = table.directory_keys
+
+            columns['packs'].extend([pack_key] * len(order))
+            columns['dirkeys'].extend(directory_keys[r] if directory_keys is not None else 0 for r in order)
+            columns['keys'].extend(table.keys[r] for r in order)
+            columns['dats'].extend(table.dat_files[r] for r in order)
+            columns['offsets'].extend(table.offsets[r] for r in order)
+            for chunk_start in range(start, start + len(order), cls.SCAN_CHUNK_ROWS):
+                chunks.append((pack, chunk_start, min(chunk_start + cls.SCAN_CHUNK_ROWS, start + len(order))))
+
+        count = len(columns['keys'])
+        for name in cls._HEADER_COLUMNS:
+            columns[name].frombytes(bytes(columns[name].itemsize * count))
+
+        logger.info('Scanning %u files' % count)
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='catalog') as executor:
+            for _ in executor.map(lambda c: cls._scan_rows(columns, checksums, *c), chunks):
+                pass
+        return cls(columns, game_version, checksums)
+
+    @classmethod
+    def _scan_rows(cls, columns: Dict[str, array], checksums: bool, pack: Pack, start: int, stop: int):
+        dats = columns['dats']
+        offsets = columns['offsets']
+        if checksums:
+            # The stored data of every file is read, in offset order.
+            with pack.scan():
+                cls.__read_rows(columns, checksums, pack, start, stop)
+            return
+        # Only the headers are read; hint them in ranges of nearby files.
+        range_start = range_end = None
+        for row in range(start, stop):
+            if range_start is not None and (dats[row] != dats[row - 1] or offsets[row] - range_end > cls.SCAN_HINT_MAX_GAP):
+                pack.will_need(dats[row - 1], range_start, range_end - range_start)
+                range_start = None
+            if range_start is None:
+                range_start = offsets[row]
+            range_end = offsets[row] + cls.PROBE_LENGTH
+        if range_start is not None:
+            pack.will_need(dats[stop - 1], range_start, range_end - range_start)
+        cls.__read_rows(columns, checksums, pack, start, stop)
+
+    @classmethod
+    def __read_rows(cls, columns: Dict[str, array], checksums: bool, pack: Pack, start: int, stop: int):
+        dats = columns['dats']
+        offsets = columns['offsets']
+        previous = None
+        for row in range(start, stop):
+            location = (dats[row], offsets[row])
+            if location == previous:
+                # Aliases of the same data share a location; copy the last row.
+                for name in cls._HEADER_COLUMNS:
+                    columns[name][row] = columns[name][row - 1]
+                continue
+            previous = location
+            values = cls._read_header(pack, *location)
+            if values is None:
+                continue
+            stored_length = values[-1]
+            (columns['types'][row], columns['sizes'][row], columns['blocks'][row],
+             columns['formats'][row], columns['widths'][row], columns['heights'][row]) = values[:-1]
+            if checksums:
+                columns['crcs'][row] = cls._compute_checksum(pack, location[0], location[1], stored_length)
+
+    @classmethod
+    def _compute_checksum(cls, pack: Pack, dat_file: int, offset: int, length: int) -> int:
+        crc = 0
+        end = offset + length
+        while offset < end:
+            chunk = pack.read_data(dat_file, offset, min(cls.CHECKSUM_READ_LENGTH, end - offset))
+            if len(chunk) == 0:
+                break
+            crc = zlib.crc32(chunk, crc)
+            offset += len(chunk)
+        return crc
+
+    @classmethod
+    def _read_header(cls, pack: Pack, dat_file: int, offset: int) -> Optional[tuple]:
+        """
+        Read the catalog values of the file at a dat offset, followed by the
+        length of its stored data.
+        """
+        HEADER_LENGTH_OFFSET = 0x00
+        FILE_TYPE_OFFSET = 0x04
+        RAW_SIZE_OFFSET = 0x08
+        BLOCK_COUNT_OFFSET = 0x14
+        BLOCK_INFO_OFFSET = 0x18
+        BLOCK_INFO_LENGTH = 0x08
+        LOD_INFO_LENGTH = 0x14
+        LOD_BLOCK_COUNT_OFFSET = 0x10
+        IMAGE_HEADER_LENGTH = 0x50
+        IMAGE_FORMAT_OFFSET = 0x04
+        IMAGE_WIDTH_OFFSET = 0x08
+
+        probe = pack.read_data(dat_file, offset, cls.PROBE_LENGTH)
+        try:
+            header_length, file_type, raw_size = struct.unpack_from('<lll', probe, HEADER_LENGTH_OFFSET)
+            block_count, = struct.unpack_from('<h', probe, BLOCK_COUNT_OFFSET)
+            block_count = max(block_count, 0)
+            required = header_length + (IMAGE_HEADER_LENGTH if file_type == FileType.Image.value else 0)
+            if required > len(probe):
+                probe = pack.read_data(dat_file, offset, required)
+
+            if file_type == FileType.Default.value:
+                stored_length = header_length
+                for i in range(block_count):
+                    block_offset, block_size = struct.unpack_from('<LH', probe, BLOCK_INFO_OFFSET + i * BLOCK_INFO_LENGTH)
+                    stored_length = max(stored_length, header_length + block_offset + block_size)
+                return file_type, raw_size & 0xFFFFFFFF, block_count, 0, 0, 0, stored_length
+            if file_type == FileType.Image.value:
+                stored_length = header_length
+                lod_blocks = 0
+                for i in range(block_count):
+                    lod_offset, lod_size = struct.unpack_from('<LL', probe, BLOCK_INFO_OFFSET + i * LOD_INFO_LENGTH)
+                    lod_blocks += struct.unpack_from('<L', probe, BLOCK_INFO_OFFSET + i * LOD_INFO_LENGTH + LOD_BLOCK_COUNT_OFFSET)[0]
+                    stored_length = max(stored_length, header_length + lod_offset + lod_size)
+                image_format, = struct.unpack_from('<H', probe, header_length + IMAGE_FORMAT_OFFSET)
+                width, height = struct.unpack_from('<HH', probe, header_length + IMAGE_WIDTH_OFFSET)
+                return file_type, raw_size & 0xFFFFFFFF, lod_blocks, image_format, width, height, stored_length
+            if file_type == FileType.Empty.value:
+                stored_length = header_length
+            else:
+                # Layout unknown; assume the data runs up to the next entry.
+                stored_length = pack.get_entry_end(dat_file, offset) - offset
+            return file_type & 0xFF, raw_size & 0xFFFFFFFF, block_count, 0, 0, 0, stored_length
+        except struct.error:
+            logger.warning('Unreadable header in %s at dat%u:%08X' % (pack, dat_file, offset))
+            return None
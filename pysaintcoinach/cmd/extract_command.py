@@ -0,0 +1,68 @@
+from pathlib import Path
+import logging
+from tqdm import tqdm
+
+from . import IXivShellCommandMixin
+from ..extract import Extractor
+
+
+logger = logging.getLogger('xivshell')
+
+
+class ExtractCommand(IXivShellCommandMixin):
+
+    def do_extract(self, args):
+        """
+        Save raw contents of many files: the given paths, all files of the
+        pack containing a path (-p), or all files below a directory (-d).
+        """
+
+        import argparse
+        parser = argparse.ArgumentParser(prog='extract')
+        parser.add_argument(dest='paths', nargs='*')
+        group = parser.add_mutually_exclusive_group()
+        group.add_argument('-p', '--pack', help='extract the pack containing this path')
+        group.add_argument('-d', '--directory', help='extract all files below this directory')
+        parser.add_argument('-j', '--jobs', type=int, default=None, help='number of files inflated at once')
+        parser.add_argument('-o', '--output', default=None, help='target directory')
+        parser.add_argument('--skip-existing', action='store_true', help='leave files already extracted alone')
+        parser.add_argument('--resume', action='store_true', help='continue an interrupted extraction')
+
+        try:
+            parsed_args = parser.parse_args(args.split())
+        except SystemExit:
+            return False
+
+        if parsed_args.pack is None and parsed_args.directory is None and len(parsed_args.paths) == 0:
+            logger.error('No files to extract.')
+            return False
+
+        extractor = Extractor(self._realm.packs,
+                              parsed_args.output or Path(self._realm.game_version),
+                              max_workers=parsed_args.jobs,
+                              skip_existing=parsed_args.skip_existing,
+                              resume=parsed_args.resume)
+
+        with tqdm(total=0, desc='extract', unit='file', ncols=150,
+                  bar_format='{l_bar:>50.50}{bar}{r_bar:50}') as t:
+            def progress(done, total, path):
+                t.total = total
+                t.set_description(path, refresh=False)
+                t.update(done - t.n)
+
+            try:
+                if parsed_args.pack is not None:
+                    extractor.extract_pack(parsed_args.pack, progress)
+                elif parsed_args.directory is not None:
+                    extractor.extract_directory(parsed_args.directory, progress)
+                else:
+                    extractor.extract_paths(parsed_args.paths, progress)
+            except FileNotFoundError:
+                logger.error('Pack or directory not found.')
+
+        print("\n")
+        logger.info('%d files exported, %d skipped, %d not found, %d failed',
+                    extractor.written, extractor.skipped, extractor.missing, extractor.failed)
+
+        # Do not quit
+        return False
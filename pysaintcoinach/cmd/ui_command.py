@@ -20,6 +20,8 @@ class UiCommand(IXivShellCommandMixin):
         '/de',
         '/hq'
     ]
+    # Number of icons hinted to the OS ahead of the export.
+    PREFETCH_FILES = 256
 
     def do_ui(self, args: str):
         """
@@ -49,10 +51,15 @@ class UiCommand(IXivShellCommandMixin):
 
         count = 0
 
-        with tqdm(self.__build_file_list(_min, _max),
+        file_list = self.__build_file_list(_min, _max)
+        with tqdm(file_list,
                   'file', unit='file', ncols=150,
                   bar_format='{l_bar:>50.50}{bar}{r_bar:50}') as t:
-            for file_path in t:
+            for i, file_path in enumerate(t):
+                if i % self.PREFETCH_FILES == 0:
+                    # Hint the files after the ones being processed.
+                    self._realm.packs.will_need(file_list[i + self.PREFETCH_FILES if i > 0 else 0:
+                                                          i + 2 * self.PREFETCH_FILES])
                 t.set_description(file_path)
                 try:
                     if self.__process(file_path):
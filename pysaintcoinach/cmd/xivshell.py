@@ -12,6 +12,7 @@ from .all_exd_command import AllExdCommand
 from .all_exd_raw_command import AllExdRawCommand
 from .bgm_command import BgmCommand
 from .exd_command import ExdCommand
+from .extract_command import ExtractCommand
 from .image_command import ImageCommand
 from .language_command import LanguageCommand
 from .raw_command import RawCommand
@@ -26,6 +27,7 @@ class XivShell(cmd.Cmd,
                AllExdRawCommand,
                BgmCommand,
                ExdCommand,
+               ExtractCommand,
                ImageCommand,
                LanguageCommand,
                RawCommand,
@@ -0,0 +1,282 @@
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock, get_ident
+from typing import Dict, Hashable, Optional, Tuple, Union
+import logging
+import os
+import re
+
+
+logger = logging.getLogger(__name__)
+
+
+class DataCache(object):
+    """
+    Least-recently-used cache of decompressed file data, bounded by the total
+    size of the cached buffers.
+
+    Pinned entries count towards the budget but are never evicted.
+    """
+
+    DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+    @property
+    def max_bytes(self) -> int: return self._max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, value):
+        with self._lock:
+            self._max_bytes = value
+            self._evict()
+
+    @property
+    def size(self) -> int: return self._size
+
+    @property
+    def hits(self) -> int: return self._hits
+
+    @property
+    def misses(self) -> int: return self._misses
+
+    @property
+    def evictions(self) -> int: return self._evictions
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self._max_bytes = max_bytes
+        self._lock = Lock()
+        self._entries = OrderedDict()  # type: OrderedDict[Hashable, bytes]
+        self._pins = {}  # type: Dict[Hashable, int]
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key: Hashable, value: bytes):
+        # Cached data is shared by every reader, so only an immutable copy
+        # is kept.
+        if not isinstance(value, bytes):
+            value = bytes(value)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            if len(value) > self._max_bytes and key not in self._pins:
+                return
+            self._entries[key] = value
+            self._size += len(value)
+            self._evict()
+
+    def pin(self, key: Hashable):
+        """
+        Keep the entry for a key in the cache until it is unpinned.
+
+        A key may be pinned before its data has been cached, and must be
+        unpinned as many times as it was pinned.
+        """
+        with self._lock:
+            self._pins[key] = self._pins.get(key, 0) + 1
+
+    def unpin(self, key: Hashable):
+        with self._lock:
+            count = self._pins.get(key, 0) - 1
+            if count > 0:
+                self._pins[key] = count
+            else:
+                self._pins.pop(key, None)
+                self._evict()
+
+    def remove(self, key: Hashable):
+        with self._lock:
+            value = self._entries.pop(key, None)
+            if value is not None:
+                self._size -= len(value)
+
+    def clear(self):
+        """
+        Remove every unpinned entry from the cache.
+        """
+        with self._lock:
+            for key in [k for k in self._entries if k not in self._pins]:
+                self._size -= len(self._entries.pop(key))
+
+    def _evict(self):
+        excess = self._size - self._max_bytes
+        if excess <= 0:
+            return
+        victims = []
+        for key, value in self._entries.items():
+            if excess <= 0:
+                break
+            if key in self._pins:
+                continue
+            victims.append(key)
+            excess -= len(value)
+        for key in victims:
+            self._size -= len(self._entries.pop(key))
+            self._evictions += 1
+
+
+class SpillCache(object):
+    """
+    On-disk cache of decompressed file data, used behind a `DataCache` so
+    that data inflated once is read back as-is on later runs.
+
+    Entries are keyed by pack, dat file and offset, and stored as plain files
+    below a directory per game version. The total size of the entries of all
+    versions is kept under `max_bytes` by deleting the least recently used
+    ones, which are tracked by their modification times across runs.
+    """
+
+    DEFAULT_MAX_BYTES = 4 * 1024 * 1024 * 1024
+
+    @property
+    def directory(self) -> Path: return self._directory
+
+    @property
+    def game_version(self) -> str: return self._game_version
+
+    @property
+    def max_bytes(self) -> int: return self._max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, value):
+        with self._lock:
+            self._max_bytes = value
+            self._evict()
+
+    @property
+    def size(self) -> int:
+        self.__load()
+        return self._size
+
+    @property
+    def hits(self) -> int: return self._hits
+
+    @property
+    def misses(self) -> int: return self._misses
+
+    @property
+    def evictions(self) -> int: return self._evictions
+
+    def __init__(self, directory: Union[str, Path], game_version: str = '', max_bytes: int = DEFAULT_MAX_BYTES):
+        self._directory = Path(directory)
+        self._game_version = game_version
+        # Anything but a plain version string would escape the directory.
+        self._version_directory = self._directory.joinpath(re.sub(r'[^\w.-]', '_', game_version) or '_')
+        self._max_bytes = max_bytes
+        self._lock = Lock()
+        self._entries = None  # type: OrderedDict[Path, int]
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def __len__(self):
+        self.__load()
+        return len(self._entries)
+
+    def __load(self):
+        # Lists the existing entries, oldest first, on first use.
+        if self._entries is not None:
+            return
+        with self._lock:
+            if self._entries is not None:
+                return
+            self._directory.mkdir(parents=True, exist_ok=True)
+            found = []
+            for path in self._directory.rglob('*.bin'):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                found.append((stat.st_mtime, path, stat.st_size))
+            found.sort(key=lambda e: e[0])
+            self._entries = OrderedDict((path, size) for _, path, size in found)
+            self._size = sum(size for _, _, size in found)
+            logger.info('Spill cache holds %u bytes in: %s' % (self._size, self._directory))
+            self._evict()
+
+    def _get_path(self, key: Tuple[int, int, int]) -> Path:
+        pack_key, dat_file, offset = key
+        return self._version_directory.joinpath('%06x' % pack_key, '%u_%010x.bin' % (dat_file, offset))
+
+    def get(self, key: Tuple[int, int, int]) -> Optional[bytes]:
+        """
+        Get the data for a (pack, dat file, offset) key, or None.
+        """
+        self.__load()
+        path = self._get_path(key)
+        with self._lock:
+            if path not in self._entries:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(path)
+        try:
+            with path.open(mode='rb') as f:
+                data = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            # Deleted by another process sharing the directory.
+            with self._lock:
+                self._size -= self._entries.pop(path, 0)
+                self._misses += 1
+            return None
+        with self._lock:
+            self._hits += 1
+        return data
+
+    def put(self, key: Tuple[int, int, int], value: bytes):
+        self.__load()
+        if len(value) > self._max_bytes:
+            return
+        path = self._get_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Written aside and renamed, so readers never see partial entries.
+        temp_path = path.with_name('%s.%u.%u.tmp' % (path.name, os.getpid(), get_ident()))
+        try:
+            temp_path.write_bytes(value)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning('Unable to write %s: %s' % (path, e))
+            return
+        with self._lock:
+            self._size -= self._entries.pop(path, 0)
+            self._entries[path] = len(value)
+            self._size += len(value)
+            self._evict()
+
+    def clear(self):
+        self.__load()
+        with self._lock:
+            for path in list(self._entries):
+                self._remove(path)
+
+    def _evict(self):
+        if self._entries is None:
+            return
+        while self._size > self._max_bytes and self._entries:
+            self._remove(next(iter(self._entries)))
+            self._evictions += 1
+
+    def _remove(self, path: Path):
+        self._size -= self._entries.pop(path)
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,215 @@
+from pathlib import Path
+from typing import Iterable, List, Optional, Set, Tuple, Union
+import logging
+
+from .catalog import Catalog
+from .extract import Extractor
+from .ex.excollection import ExCollection
+from .indexfile import hash_paths
+from .pack import PackCollection, PackIdentifier
+
+
+logger = logging.getLogger(__name__)
+
+FileKey = Tuple[int, int, int]
+
+
+class CatalogDiff(object):
+    """
+    Differences between two versions of the game data, found by comparing
+    their catalogs entry by entry.
+
+    Files are matched by pack, directory key and file key. A file present in
+    both is changed if the checksums of its stored data differ; if either
+    catalog was scanned without checksums, its header values and location
+    are compared instead. Nothing is inflated.
+    """
+
+    @property
+    def old(self) -> Catalog: return self._old
+
+    @property
+    def new(self) -> Catalog: return self._new
+
+    @property
+    def added(self) -> List[int]:
+        """
+        Rows of the new catalog for files that didn't exist before.
+        """
+        return self._added
+
+    @property
+    def removed(self) -> List[int]:
+        """
+        Rows of the old catalog for files that no longer exist.
+        """
+        return self._removed
+
+    @property
+    def changed(self) -> List[int]:
+        """
+        Rows of the new catalog for files whose data changed.
+        """
+        return self._changed
+
+    def __init__(self, old: Catalog, new: Catalog):
+        self._old = old
+        self._new = new
+        self._added = []  # type: List[int]
+        self._removed = []  # type: List[int]
+        self._changed = []  # type: List[int]
+
+        self.__compare()
+
+    @classmethod
+    def compare(cls,
+                old: Union[Catalog, PackCollection],
+                new: Union[Catalog, PackCollection],
+                max_workers: int = None) -> 'CatalogDiff':
+        """
+        Compare two catalogs, or two collections which are scanned with
+        checksums first.
+        """
+        if isinstance(old, PackCollection):
+            old = Catalog.scan(old, max_workers=max_workers, checksums=True)
+        if isinstance(new, PackCollection):
+            new = Catalog.scan(new, max_workers=max_workers, checksums=True)
+        return cls(old, new)
+
+    def __compare(self):
+        old, new = self.old, self.new
+        use_checksums = old.has_checksums and new.has_checksums
+        if use_checksums:
+            columns = ('crcs',)
+        else:
+            columns = ('dats', 'offsets', 'types', 'sizes', 'blocks', 'formats', 'widths', 'heights')
+
+        old_columns = [old.get_column(name) for name in columns]
+        new_columns = [new.get_column(name) for name in columns]
+        seen = set()  # type: Set[int]
+        for row in range(len(new)):
+            old_row = old.find(new.pack_keys[row], new.directory_keys[row], new.file_keys[row])
+            if old_row is None:
+                self._added.append(row)
+                continue
+            seen.add(old_row)
+            if any(o[old_row] != n[row] for o, n in zip(old_columns, new_columns)):
+                self._changed.append(row)
+        self._removed = [row for row in range(len(old)) if row not in seen]
+
+    def __len__(self):
+        return len(self.added) + len(self.removed) + len(self.changed)
+
+    def get_file_keys(self) -> Set[FileKey]:
+        """
+        Get the (pack, directory key, file key) of every added, removed or
+        changed file.
+        """
+        keys = set()
+        for catalog, rows in ((self.new, self.added), (self.old, self.removed), (self.new, self.changed)):
+            for row in rows:
+                keys.add((catalog.pack_keys[row], catalog.directory_keys[row], catalog.file_keys[row]))
+        return keys
+
+    def get_sheet_changes(self,
+                          old_collection: ExCollection,
+                          new_collection: ExCollection) -> Tuple[List[str], List[str], List[str]]:
+        """
+        Get the names of the sheets that were added, removed or changed.
+
+        A sheet is changed if its header or any of its data files were added,
+        removed or changed.
+        """
+        old_names = old_collection.available_sheets
+        new_names = new_collection.available_sheets
+        added = sorted(new_names - old_names)
+        removed = sorted(old_names - new_names)
+
+        keys = self.get_file_keys()
+        changed = []
+        for name in sorted(old_names & new_names):
+            paths = set(get_sheet_paths(old_collection, name)) | set(get_sheet_paths(new_collection, name))
+            if any(key in keys for key in _get_file_keys(new_collection.pack_collection, paths)):
+                changed.append(name)
+        return added, removed, changed
+
+    def extract(self, packs: PackCollection, target: Union[str, Path], paths: Iterable[str] = None) -> int:
+        """
+        Write the data of every added or changed file of `packs` (which must
+        hold the new version) below `target`, returning the number written.
+
+        Files whose path is among `paths` are written under that path, others
+        under their pack and keys in hexadecimal.
+        """
+        target = Path(target)
+        keys = {}
+        for row in sorted(self.added + self.changed, key=lambda r: (self.new.pack_keys[r], self.new.offsets[r])):
+            keys[(self.new.pack_keys[row], self.new.directory_keys[row], self.new.file_keys[row])] = row
+
+        named = []
+        if paths is not None:
+            paths = list(paths)
+            for path, key in zip(paths, _get_file_keys(packs, paths)):
+                if keys.pop(key, None) is not None:
+                    named.append(path)
+
+        # Written the way bulk extractions write them, textures included.
+        extractor = Extractor(packs, target)
+        extractor.extract_paths(named)
+
+        items = []
+        for (pack_key, directory_key, file_key), row in keys.items():
+            pack_id = self.new.get_pack_id(row)
+            pack = packs.get_pack(pack_id)
+            try:
+                file = pack.get_file_from_keys(directory_key if pack.source.index.table.directory_keys is not None
+                                               else None,
+                                               file_key)
+            except TypeError:
+                continue
+            if file is None:
+                continue
+            items.append(('%s/%08X/%08X' % (pack, directory_key, file_key), file))
+        extractor.extract_files(items)
+        return extractor.written
+
+
+def get_sheet_paths(collection: ExCollection, name: str) -> List[str]:
+    """
+    Get the paths of the header and all data files of a sheet.
+    """
+    EX_HPATH_FORMAT = "exd/%s.exh"
+    PARTIAL_FILE_NAME_FORMAT = "exd/%s_%u%s.exd"
+
+    if name not in collection.available_sheets:
+        return []
+    paths = [EX_HPATH_FORMAT % name]
+    if not collection.pack_collection.file_exists(paths[0]):
+        return paths
+    header = collection.get_sheet(name).header
+    for _range in header.data_file_ranges:
+        for language in header.available_languages:
+            paths.append(PARTIAL_FILE_NAME_FORMAT % (name, _range.start, language.get_suffix()))
+    return paths
+
+
+def _get_file_keys(packs: PackCollection, paths: Iterable[str]) -> List[Optional[FileKey]]:
+    # Keys in the form used by catalogs; None for paths outside any pack.
+    paths = list(paths)
+    directory_hashes, name_hashes, path_hashes = hash_paths(paths)
+    keys = []
+    for i, path in enumerate(paths):
+        pack_id = PackIdentifier.get(path)
+        if pack_id is None:
+            keys.append(None)
+            continue
+        try:
+            pack = packs.get_pack(pack_id)
+        except FileNotFoundError:
+            keys.append(None)
+            continue
+        if pack.source.index.table.directory_keys is None:
+            keys.append((hash(pack_id), 0, path_hashes[i]))
+        else:
+            keys.append((hash(pack_id), directory_hashes[i], name_hashes[i]))
+    return keys
@@ -74,6 +74,12 @@ class Column(object):
     def read(self, buffer: bytes, row: "ex.IDataRow", offset: int = None):
         return self.read_raw(buffer, row, offset)
 
+    def convert(self, row: "ex.IDataRow", value: object):
+        """
+        Convert a value read by `read_raw` to what `read` returns.
+        """
+        return value
+
     def read_raw(self, buffer: bytes, row: "ex.IDataRow", offset: int = None):
         if offset is None:
             return self.reader.read(buffer, col=self, row=row)
@@ -0,0 +1,184 @@
+from array import array
+from typing import Iterator, List, Sequence, Union
+import sys
+
+from .column import Column
+from .datareaders import DelegateDataReader, PackedBooleanDataReader, StringDataReader
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# `array` type codes and NumPy types of the `struct` formats of fixed-size values.
+_ARRAY_TYPE_CODES = {'b': 'b', 'B': 'B', 'h': 'h', 'H': 'H',
+                     'l': 'i' if array('i').itemsize == 4 else 'l',
+                     'L': 'I' if array('I').itemsize == 4 else 'L',
+                     'f': 'f', 'q': 'q'}
+_NUMPY_TYPES = {'b': 'i1', 'B': 'u1', 'h': '>i2', 'H': '>u2', 'l': '>i4', 'L': '>u4', 'f': '>f4', 'q': '>i8'}
+
+# Translation tables turning a byte into ASCII '1' or '0' for a boolean.
+_BOOLEAN_DIGITS = {}
+
+
+def _get_boolean_digits(mask: int) -> bytes:
+    digits = _BOOLEAN_DIGITS.get(mask)
+    if digits is None:
+        digits = _BOOLEAN_DIGITS[mask] = bytes(0x31 if b & mask else 0x30 for b in range(256))
+    return digits
+
+
+class Bitset(object):
+    """
+    Boolean column packed into the bits of an integer, the first row in the
+    lowest bit.
+    """
+
+    __slots__ = ('_value', '_length')
+
+    @property
+    def value(self) -> int: return self._value
+
+    def __init__(self, value: int, length: int):
+        self._value = value
+        self._length = length
+
+    @classmethod
+    def from_bytes(cls, data: bytes, mask: int = 0xFF) -> 'Bitset':
+        """
+        Create a bitset with one bit per byte of `data`, set if any bit of
+        `mask` is set in that byte.
+        """
+        if len(data) == 0:
+            return cls(0, 0)
+        return cls(int(data.translate(_get_boolean_digits(mask))[::-1], 2), len(data))
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index: int) -> bool:
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError(index)
+        return (self._value >> index) & 1 != 0
+
+    def __iter__(self) -> Iterator[bool]:
+        value = self._value
+        for i in range(self._length):
+            yield (value >> i) & 1 != 0
+
+    def __eq__(self, other):
+        if not isinstance(other, Bitset):
+            return NotImplemented
+        return self._value == other._value and self._length == other._length
+
+    def __hash__(self):
+        return hash((self._value, self._length))
+
+    def __and__(self, other: 'Bitset') -> 'Bitset':
+        return Bitset(self._value & other._value, max(self._length, other._length))
+
+    def __or__(self, other: 'Bitset') -> 'Bitset':
+        return Bitset(self._value | other._value, max(self._length, other._length))
+
+    def __xor__(self, other: 'Bitset') -> 'Bitset':
+        return Bitset(self._value ^ other._value, max(self._length, other._length))
+
+    def __invert__(self) -> 'Bitset':
+        return Bitset(~self._value & ((1 << self._length) - 1), self._length)
+
+    def __repr__(self):
+        return "Bitset(%s)" % ''.join('1' if b else '0' for b in self)
+
+    def count(self) -> int:
+        """
+        Get the number of set bits.
+        """
+        return bin(self._value).count('1')
+
+    def indexes(self) -> List[int]:
+        """
+        Get the positions of the set bits, in order.
+        """
+        digits = bin(self._value)[:1:-1]
+        return [i for i, d in enumerate(digits) if d == '1']
+
+    def to_bytes(self) -> bytes:
+        return self._value.to_bytes((self._length + 7) // 8, 'little')
+
+    def extend(self, other: 'Bitset') -> 'Bitset':
+        """
+        Get a bitset of this one's bits followed by another's.
+        """
+        return Bitset(self._value | other._value << self._length, self._length + other._length)
+
+
+def use_numpy(value: bool = None) -> bool:
+    """
+    Whether columns are decoded into NumPy arrays; by default, if it's
+    installed.
+    """
+    if value is None:
+        return numpy is not None
+    if value and numpy is None:
+        raise ImportError('NumPy is not installed')
+    return value
+
+
+def decode_fixed_column(column: Column, block: Union[bytes, bytearray], stride: int, count: int,
+                        as_numpy: bool = False):
+    """
+    Decode a fixed-size column from `count` rows of fixed-size data of
+    `stride` bytes each, stored one after the other in `block`.
+
+    Numbers are decoded into an `array.array` and booleans into a `Bitset`;
+    or, with `as_numpy`, into arrays viewing `block`.
+    """
+    reader = column.reader
+    offset = column.offset
+    if isinstance(reader, PackedBooleanDataReader):
+        fmt, mask = '?', reader.mask
+    elif isinstance(reader, DelegateDataReader) and reader.format is not None:
+        fmt, mask = reader.format, 0xFF
+    else:
+        raise TypeError('Column %u is not of a fixed-size type' % column.index)
+
+    if as_numpy:
+        if count == 0:
+            # NumPy won't view an empty block with a stride.
+            return numpy.zeros(0, bool if fmt == '?' else _NUMPY_TYPES[fmt])
+        if fmt == '?':
+            values = numpy.ndarray((count,), 'u1', block, offset, (stride,))
+            return (values & mask) != 0
+        return numpy.ndarray((count,), _NUMPY_TYPES[fmt], block, offset, (stride,))
+
+    # Slicing with a step gathers the bytes of every row in one pass.
+    if fmt == '?':
+        return Bitset.from_bytes(bytes(block[offset::stride][:count]), mask)
+    size = reader.length
+    if size == 1:
+        data = block[offset::stride][:count]
+    else:
+        data = bytearray(size * count)
+        for i in range(size):
+            data[i::size] = block[offset + i::stride][:count]
+    values = array(_ARRAY_TYPE_CODES[fmt], bytes(data))
+    if sys.byteorder == 'little':
+        values.byteswap()
+    return values
+
+
+def decode_string_column(column: Column, buffer: bytes, bases: Sequence[int], fixed_size: int) -> list:
+    """
+    Decode a string column of the rows whose fixed-size data starts at each
+    of `bases` in `buffer`.
+    """
+    reader = column.reader  # type: StringDataReader
+    offset = column.offset
+    return [reader.read_string(buffer, base + offset, base + fixed_size) for base in bases]
+
+
+def is_fixed_size(column: Column) -> bool:
+    return not isinstance(column.reader, StringDataReader)
@@ -44,11 +44,19 @@ class DelegateDataReader(DataReader):
     @property
     def type(self): return self._type
 
-    def __init__(self, name, length, type, func):
+    @property
+    def format(self) -> str:
+        """
+        Gets the `struct` format of the value, without byte order.
+        """
+        return self._format
+
+    def __init__(self, name, length, type, func, format=None):
         self._name = name
         self._length = length
         self._type = type
         self._func = func
+        self._format = format
 
     def read(self, buffer: bytes, **kwargs):
         if 'offset' in kwargs:
@@ -68,6 +76,9 @@ class PackedBooleanDataReader(DataReader):
     @property
     def type(self): return type(bool)
 
+    @property
+    def mask(self) -> int: return self._mask
+
     def __init__(self, mask):
         self._mask = mask
         self._name = "bit&%02X" % mask
@@ -95,25 +106,44 @@ class StringDataReader(DataReader):
             raise NotImplementedError
         field_offset = self.get_field_offset(kwargs['col'], kwargs['row'])
         end_of_fixed = kwargs['row'].offset + kwargs['row'].sheet.header.fixed_size_data_length
-
+        return self.read_string(buffer, field_offset, end_of_fixed)
+
+    def read_string(self, buffer: bytes, field_offset: int, end_of_fixed: int):
+        """
+        Read the string referenced at `field_offset` by a row whose
+        fixed-size data ends at `end_of_fixed`.
+        """
+        raw = self.read_bytes(buffer, field_offset, end_of_fixed)
+        return text.decode_string(raw) if raw is not None else None
+
+    def read_lazy_string(self, buffer: bytes, field_offset: int, end_of_fixed: int):
+        """
+        Read a string as `read_string` does, but decode it only once it's used.
+        """
+        raw = self.read_bytes(buffer, field_offset, end_of_fixed)
+        return text.LazyXivString(raw) if raw is not None else None
+
+    def read_bytes(self, buffer: bytes, field_offset: int, end_of_fixed: int):
+        """
+        Read the undecoded bytes of a string, without its terminator.
+        """
         start = end_of_fixed + unpack_from(">l", buffer, field_offset)[0]
         if start < 0:
             return None
 
         end = buffer.find(b'\0', start)
-        # return buffer[start:end].decode()
-        return str(text.XivStringDecoder.default().decode(buffer[start:end]))
+        return bytes(buffer[start:end])
 
 
 DATA_READERS = {0x0000: StringDataReader(),
-                0x0001: DelegateDataReader("bool", 1, type(bool), lambda d, o: d[o] != 0),
-                0x0002: DelegateDataReader("sbyte", 1, type(int), lambda d, o: unpack_from(">b", d, o)[0]),
-                0x0003: DelegateDataReader("byte", 1, type(int), lambda d, o: unpack_from(">B", d, o)[0]),
-                0x0004: DelegateDataReader("int16", 2, type(int), lambda d, o: unpack_from(">h", d, o)[0]),
-                0x0005: DelegateDataReader("uint16", 2, type(int), lambda d, o: unpack_from(">H", d, o)[0]),
-                0x0006: DelegateDataReader("int32", 4, type(int), lambda d, o: unpack_from(">l", d, o)[0]),
-                0x0007: DelegateDataReader("uint32", 4, type(int), lambda d, o: unpack_from(">L", d, o)[0]),
-                0x0009: DelegateDataReader("single", 4, type(float), lambda d, o: unpack_from(">f", d, o)[0]),
-                0x000B: DelegateDataReader("int64", 8, type(int), lambda d, o: unpack_from(">q", d, o)[0])}
+                0x0001: DelegateDataReader("bool", 1, type(bool), lambda d, o: d[o] != 0, "?"),
+                0x0002: DelegateDataReader("sbyte", 1, type(int), lambda d, o: unpack_from(">b", d, o)[0], "b"),
+                0x0003: DelegateDataReader("byte", 1, type(int), lambda d, o: unpack_from(">B", d, o)[0], "B"),
+                0x0004: DelegateDataReader("int16", 2, type(int), lambda d, o: unpack_from(">h", d, o)[0], "h"),
+                0x0005: DelegateDataReader("uint16", 2, type(int), lambda d, o: unpack_from(">H", d, o)[0], "H"),
+                0x0006: DelegateDataReader("int32", 4, type(int), lambda d, o: unpack_from(">l", d, o)[0], "l"),
+                0x0007: DelegateDataReader("uint32", 4, type(int), lambda d, o: unpack_from(">L", d, o)[0], "L"),
+                0x0009: DelegateDataReader("single", 4, type(float), lambda d, o: unpack_from(">f", d, o)[0], "f"),
+                0x000B: DelegateDataReader("int64", 8, type(int), lambda d, o: unpack_from(">q", d, o)[0], "q")}
 for i in range(0, 8):
     DATA_READERS[0x19 + i] = PackedBooleanDataReader(1 << i)
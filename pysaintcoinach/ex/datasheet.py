@@ -1,5 +1,6 @@
-from typing import Union, Tuple, Iterable as IterableT, TypeVar, Type, Dict
+from typing import Union, Tuple, Iterable as IterableT, TypeVar, Type, Dict, List, Optional
 from abc import abstractmethod
+from array import array
 from struct import unpack_from
 from collections import OrderedDict
 from threading import Lock
@@ -8,8 +9,12 @@ from ..file import File
 from .sheet import IRow, ISheet
 from .language import Language
 from .header import Header
+from .column import Column
+from .datareaders import StringDataReader
+from .columns import decode_fixed_column, decode_string_column, is_fixed_size, use_numpy
 from .. import ex
-from ..util import ConcurrentDictionary
+from ..text import LazyXivString
+from ..util import ConcurrentCache
 
 
 class IDataRow(IRow):
@@ -63,26 +68,61 @@ class DataRowBase(IDataRow):
             return value
 
         column = self.sheet.header.get_column(column_index)
-        value = column.read(self.sheet.get_buffer(), self)
+        value = column.convert(self, self.get_raw(column_index))
         self.__value_references[column_index] = value
 
         return value
 
     def get_raw(self, column_index: int, **kwargs):
+        """
+        Get the unconverted value of a column; with `lazy=True`, strings are
+        returned as `LazyXivString`s rather than decoded.
+        """
         column = self.sheet.header.get_column(column_index)
+        if kwargs.get('lazy', False) and isinstance(column.reader, StringDataReader):
+            return column.reader.read_lazy_string(self.sheet.get_buffer(), *self.__get_string_offsets(column))
         return column.read_raw(self.sheet.get_buffer(), self)
 
+    def get_raw_bytes(self, column_index: int) -> Optional[bytes]:
+        """
+        Get the undecoded bytes of a string column.
+        """
+        column = self.sheet.header.get_column(column_index)
+        if not isinstance(column.reader, StringDataReader):
+            raise TypeError('Column %u is not a string' % column_index)
+        return column.reader.read_bytes(self.sheet.get_buffer(), *self.__get_string_offsets(column))
+
+    def raw_values(self) -> List[object]:
+        """
+        Get the unconverted values of every column, in column order.
+
+        All columns are read at once, but not kept on the row.
+        """
+        values = self.sheet.header.read_raw_values(self.sheet.get_buffer(), self.offset)
+        return [str(v) if type(v) is LazyXivString else v for v in values]
+
     def column_values(self) -> IterableT[object]:
-        buffer = self.sheet.get_buffer()
-        for column in self.sheet.header.columns:
-            yield column.read(buffer, self)
+        for column, value in zip(self.sheet.header.columns, self.raw_values()):
+            yield column.convert(self, value)
 
     def items(self):
         item_dict = OrderedDict()
-        for c in self.sheet.header.columns:
-            item_dict[c.name] = self[c.index]
+        references = self.__value_references
+        for c, value in zip(self.sheet.header.columns, self.raw_values()):
+            converted = references.get(c.index)
+            if converted is None:
+                converted = c.convert(self, value)
+                if converted is not None:
+                    references[c.index] = converted
+            item_dict[c.name] = converted
         return item_dict
 
+    def __get_string_offsets(self, column: Column) -> Tuple[int, int]:
+        # Where the offset of the column's string is, and where the row's
+        # fixed-size data ends.
+        return (column.reader.get_field_offset(column, self),
+                self.offset + self.sheet.header.fixed_size_data_length)
+
 
 class PartialDataSheet(IDataSheet[T]):
     @property
@@ -114,8 +154,10 @@ class PartialDataSheet(IDataSheet[T]):
                  source_sheet: IDataSheet[T],
                  _range: range,
                  file: File):
-        self.__rows = None  # type: ConcurrentDictionary[int, T]
+        self.__rows = None  # type: ConcurrentCache[int, T]
         self.__row_offsets = {}
+        self.__row_bases = None  # type: array
+        self.__fixed_data = None  # type: bytes
         self.__source_sheet = source_sheet
         self.__range = _range
         self.__file = file
@@ -139,7 +181,7 @@ class PartialDataSheet(IDataSheet[T]):
         count = int(header_len / ENTRY_LENGTH)
         current_position = ENTRIES_OFFSET
 
-        self.__rows = ConcurrentDictionary()
+        self.__rows = ConcurrentCache()
         for i in range(count):
             key, = unpack_from(">l", buffer, current_position + ENTRY_KEY_OFFSET)
             off, = unpack_from(">l", buffer, current_position + ENTRY_POSITION_OFFSET)
@@ -178,6 +220,53 @@ class PartialDataSheet(IDataSheet[T]):
         for key, off in self.__row_offsets.items():
             yield self.__rows.get_or_add(key, lambda k: self._create_row(k, off))
 
+    def column_array(self, column: Union[int, str, Column], as_numpy: bool = None):
+        """
+        Decode a column of every row at once, in the order rows are iterated
+        (for variant 2 sheets, every sub-row in turn).
+
+        Numbers are decoded into an `array.array`, booleans into a `Bitset`
+        and strings into a list; or, with `as_numpy` (by default, if NumPy
+        is installed), fixed-size columns into NumPy arrays.
+        """
+        column = _get_column(self.header, column)
+        bases = self._get_row_bases()
+        if not is_fixed_size(column):
+            return decode_string_column(column, self.get_buffer(), bases, self.header.fixed_size_data_length)
+        return decode_fixed_column(column, self._get_fixed_data(), self.header.fixed_size_data_length,
+                                   len(bases), use_numpy(as_numpy))
+
+    def _get_row_bases(self) -> array:
+        """
+        Get the offsets in the buffer of the fixed-size data of every row.
+        """
+        METADATA_LENGTH = 0x06
+        SUB_ROW_KEY_LENGTH = 0x02
+
+        if self.__row_bases is None:
+            bases = array('L')
+            if self.header.variant == 1:
+                bases.extend(off + METADATA_LENGTH for off in self.__row_offsets.values())
+            else:
+                buffer = self.get_buffer()
+                stride = SUB_ROW_KEY_LENGTH + self.header.fixed_size_data_length
+                for off in self.__row_offsets.values():
+                    count, = unpack_from(">h", buffer, off + 4)
+                    first = off + METADATA_LENGTH + SUB_ROW_KEY_LENGTH
+                    bases.extend(range(first, first + count * stride, stride))
+            self.__row_bases = bases
+        return self.__row_bases
+
+    def _get_fixed_data(self) -> bytes:
+        """
+        Get the fixed-size data of every row, one after another.
+        """
+        if self.__fixed_data is None:
+            buffer = memoryview(self.get_buffer())
+            size = self.header.fixed_size_data_length
+            self.__fixed_data = b''.join([buffer[base:base + size] for base in self._get_row_bases()])
+        return self.__fixed_data
+
 
 class DataSheet(IDataSheet[T]):
     @property
@@ -198,7 +287,7 @@ class DataSheet(IDataSheet[T]):
                  header: Header,
                  language: Language):
         self.__partial_sheets_created = False
-        self.__partial_sheets = {}
+        self.__partial_sheets = ConcurrentCache()  # type: ConcurrentCache[range, ISheet[T]]
         self.__row_to_partial_sheet_map = {}
         self.__partial_sheets_lock = Lock()
         self.__collection = collection
@@ -225,13 +314,44 @@ class DataSheet(IDataSheet[T]):
     def get_buffer(self):
         raise NotImplementedError
 
+    def to_columns(self, columns: IterableT[Union[int, str, Column]] = None, as_numpy: bool = None) -> Dict:
+        """
+        Decode columns of every row at once, as `PartialDataSheet.column_array`
+        does, into a dictionary keyed by the given columns; by default, all
+        of them, by index.
+        """
+        self.__create_all_partial_sheets()
+        partials = list(self.__partial_sheets.values())  # type: List[PartialDataSheet]
+        as_numpy = use_numpy(as_numpy)
+        if columns is None:
+            columns = range(self.header.column_count)
+
+        fixed_data = None
+        result = OrderedDict()
+        for key in columns:
+            column = _get_column(self.header, key)
+            if not is_fixed_size(column):
+                values = []
+                for partial in partials:
+                    values.extend(partial.column_array(column))
+            else:
+                if fixed_data is None:
+                    fixed_data = b''.join([partial._get_fixed_data() for partial in partials])
+                values = decode_fixed_column(column, fixed_data, self.header.fixed_size_data_length,
+                                             sum(len(partial._get_row_bases()) for partial in partials), as_numpy)
+            result[key] = values
+        return result
+
     def _create_partial_sheet(self, _range: range, _file: File) -> ISheet[T]:
         return PartialDataSheet[T](self.__t_cls, self, _range, _file)
 
-    def _get_partial_file(self, _range: range) -> File:
+    def _get_partial_file_name(self, _range: range) -> str:
         PARTIAL_FILE_NAME_FORMAT = "exd/%s_%u%s.exd"
 
-        partial_file_name = PARTIAL_FILE_NAME_FORMAT % (self.header.name, _range.start, self.language.get_suffix())
+        return PARTIAL_FILE_NAME_FORMAT % (self.header.name, _range.start, self.language.get_suffix())
+
+    def _get_partial_file(self, _range: range) -> File:
+        partial_file_name = self._get_partial_file_name(_range)
         file = self.collection.pack_collection.get_file(partial_file_name)
         if file is None:
             raise FileNotFoundError(partial_file_name)
@@ -246,22 +366,18 @@ class DataSheet(IDataSheet[T]):
         if not any(res):
             raise ValueError("row")
 
-        with self.__partial_sheets_lock:
-            _range = res[0]
-            partial = self.__partial_sheets.get(_range)
-            if partial is None:
-                partial = self.__create_partial_sheet(_range)
-            return partial
+        return self.__partial_sheets.get_or_add(res[0], self.__create_partial_sheet)
 
     def __create_all_partial_sheets(self):
         with self.__partial_sheets_lock:
             if self.__partial_sheets_created:
                 return
 
+            self.collection.pack_collection.will_need(
+                [self._get_partial_file_name(_range) for _range in self.header.data_file_ranges
+                 if _range not in self.__partial_sheets])
             for _range in self.header.data_file_ranges:
-                if _range in self.__partial_sheets:
-                    continue
-                self.__create_partial_sheet(_range)
+                self.__partial_sheets.get_or_add(_range, self.__create_partial_sheet)
 
             self.__partial_sheets_created = True
 
@@ -269,7 +385,6 @@ class DataSheet(IDataSheet[T]):
         file = self._get_partial_file(_range)
 
         partial = self._create_partial_sheet(_range, file)
-        self.__partial_sheets[_range] = partial
         for k in partial.keys:
             self.__row_to_partial_sheet_map[k] = partial
         return partial
@@ -286,3 +401,14 @@ class DataSheet(IDataSheet[T]):
     def __contains__(self, row: int):
         self.__create_all_partial_sheets()
         return row in self.__row_to_partial_sheet_map
+
+
+def _get_column(header: Header, column: Union[int, str, Column]) -> Column:
+    if isinstance(column, Column):
+        return column
+    if isinstance(column, str):
+        found = header.find_column(column)
+        if found is None:
+            raise KeyError('No column named %s in sheet %s' % (column, header.name))
+        return found
+    return header.get_column(column)
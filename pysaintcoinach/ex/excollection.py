@@ -6,7 +6,7 @@ from .datasheet import DataSheet
 from .multisheet import MultiRow, MultiSheet
 from ..pack import PackCollection
 from .language import Language
-from .. import ex
+from .. import aio, ex
 
 T = TypeVar('T')
 
@@ -125,6 +125,12 @@ class ExCollection(object):
         self._sheets[name] = sheet
         return sheet
 
+    async def aget_sheet(self, *args) -> ex.ISheet:
+        """
+        Coroutine version of `get_sheet`, run on the shared executor.
+        """
+        return await aio.run((self, 'sheet', args), self.get_sheet, *args)
+
     def _create_header(self, name, file):
         return Header(self, name, file)
 
@@ -1,8 +1,10 @@
-from typing import Iterable as IterableT, Sequence as SequenceT
-from struct import unpack_from
+from typing import Iterable as IterableT, Optional, List
+from operator import itemgetter
+from struct import Struct, unpack_from
 
 from .language import Language
 from .column import Column
+from .datareaders import DelegateDataReader, PackedBooleanDataReader, StringDataReader
 from ..file import File
 from .. import ex
 
@@ -69,15 +71,93 @@ class Header(object):
         self.__collection = collection
         self.__name = name
         self.__file = file
+        self.__row_reader = None
 
         self.__build()
 
     def get_column(self, index: int) -> Column:
         return self.__columns[index]
 
+    def find_column(self, name: str) -> Optional[Column]:
+        # Columns are only named by a sheet definition; see RelationalHeader.
+        return None
+
     def create_column(self, index: int, data: bytes, offset: int) -> Column:
         return Column(self, index, data, offset)
 
+    def read_raw_values(self, buffer: bytes, offset: int) -> List[object]:
+        """
+        Read the unconverted values of every column of the row whose
+        fixed-size data starts at `offset`, in column order; strings are
+        `LazyXivString`s, decoded once they're used.
+        """
+        if self.__row_reader is None:
+            self.__row_reader = self.__compile_row_reader()
+        return self.__row_reader(buffer, offset)
+
+    def __compile_row_reader(self):
+        # The fixed-size fields of a row are read with a single struct, bytes
+        # of packed booleans once for all of their columns; booleans are then
+        # picked out of those bytes and strings located from their offsets.
+        columns = self.columns
+        if len(columns) == 0:
+            return lambda buffer, offset: []
+
+        fields = {}
+        for column in columns:
+            reader = column.reader
+            if isinstance(reader, PackedBooleanDataReader):
+                field_format = 'B'
+            elif isinstance(reader, StringDataReader):
+                field_format = 'l'
+            elif isinstance(reader, DelegateDataReader) and reader.format is not None:
+                field_format = reader.format
+            else:
+                return self.__read_raw_values_slowly
+            if fields.setdefault(column.offset, field_format) != field_format:
+                return self.__read_raw_values_slowly
+
+        fmt = '>'
+        position = 0
+        field_indexes = {}
+        for offset, field_format in sorted(fields.items()):
+            if offset < position:
+                # Columns overlap in a way a struct can't express.
+                return self.__read_raw_values_slowly
+            fmt += 'x' * (offset - position) + field_format
+            position = offset + Struct('>' + field_format).size
+            field_indexes[offset] = len(field_indexes)
+        if position > self.fixed_size_data_length:
+            return self.__read_raw_values_slowly
+        row_struct = Struct(fmt)
+
+        get_fields = itemgetter(*[field_indexes[c.offset] for c in columns])
+        single = len(columns) == 1
+        booleans = [(c.index, c.reader.mask) for c in columns if isinstance(c.reader, PackedBooleanDataReader)]
+        strings = [(c.index, c.reader, c.offset) for c in columns if isinstance(c.reader, StringDataReader)]
+        fixed_size = self.fixed_size_data_length
+
+        def read_raw_values(buffer, offset):
+            fields = get_fields(row_struct.unpack_from(buffer, offset))
+            values = [fields] if single else list(fields)
+            for i, mask in booleans:
+                values[i] = values[i] & mask != 0
+            for i, reader, column_offset in strings:
+                values[i] = reader.read_lazy_string(buffer, offset + column_offset, offset + fixed_size)
+            return values
+
+        return read_raw_values
+
+    def __read_raw_values_slowly(self, buffer: bytes, offset: int) -> List[object]:
+        values = []
+        for column in self.columns:
+            if isinstance(column.reader, StringDataReader):
+                values.append(column.reader.read_lazy_string(buffer, offset + column.offset,
+                                                             offset + self.fixed_size_data_length))
+            else:
+                values.append(column.reader.read(buffer, offset=offset + column.offset))
+        return values
+
     def __build(self):
         MAGIC = 0x46485845
         MINIMUM_LENGTH = 0x2E
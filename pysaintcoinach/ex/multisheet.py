@@ -7,7 +7,7 @@ from .language import Language
 from .header import Header
 from .datasheet import DataSheet
 from .. import ex
-from ..util import ConcurrentDictionary
+from ..util import ConcurrentCache
 
 
 class IMultiRow(IRow):
@@ -50,8 +50,8 @@ class MultiSheet(IMultiSheet[TMulti, TData]):
                  tdata_cls: Type[TData],
                  collection: 'ex.ExCollection',
                  header: Header):
-        self.__localised_sheets = ConcurrentDictionary()  # type: ConcurrentDictionary[Language, ISheet[TData]]
-        self.__rows = ConcurrentDictionary()  # type: ConcurrentDictionary[int, TMulti]
+        self.__localised_sheets = ConcurrentCache()  # type: ConcurrentCache[Language, ISheet[TData]]
+        self.__rows = ConcurrentCache()  # type: ConcurrentCache[int, TMulti]
         self.__collection = collection
         self.__header = header
         self.__tmulti_cls = tmulti_cls
@@ -104,6 +104,13 @@ class MultiSheet(IMultiSheet[TMulti, TData]):
     def __contains__(self, item):
         return item in self.active_sheet
 
+    def to_columns(self, columns=None, as_numpy: bool = None):
+        """
+        Decode columns of every row of the active language's sheet at once;
+        see `DataSheet.to_columns`.
+        """
+        return self.active_sheet.to_columns(columns, as_numpy)
+
 
 class MultiRow(IMultiRow):
     def __init__(self, sheet: IMultiSheet, key: int):
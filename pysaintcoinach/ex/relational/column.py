@@ -43,9 +43,11 @@ class RelationalColumn(Column):
 
     def read(self, buffer: bytes, row: 'ex.datasheet.IDataRow', offset: int = None):
         base_val = super(RelationalColumn, self).read(buffer, row, offset)
+        return self.convert(row, base_val)
 
+    def convert(self, row: 'ex.datasheet.IDataRow', value: object):
         _def = self.definition
-        return _def.convert(row, base_val, self.index) if _def is not None else base_val
+        return _def.convert(row, value, self.index) if _def is not None else value
 
     def __str__(self):
         return self.name or str(self.index)
@@ -6,7 +6,7 @@ from .sheet import IRelationalRow, IRelationalSheet
 from ..sheet import ISheet
 from ...file import File
 from ... import ex
-from ...util import ConcurrentDictionary
+from ...util import ConcurrentCache
 # import ex.relational
 
 
@@ -79,7 +79,7 @@ class RelationalDataSheet(DataSheet[T], IRelationalDataSheet[T]):
                  language: 'ex.Language'):
         super(RelationalDataSheet, self).__init__(t_cls, collection, header, language)
         self.__t_cls = t_cls
-        self.__indexes = ConcurrentDictionary()  # type: ConcurrentDictionary[str, RelationalDataIndex[T]]
+        self.__indexes = ConcurrentCache()  # type: ConcurrentCache[str, RelationalDataIndex[T]]
 
     def _create_partial_sheet(self, _range: range, _file: File) -> ISheet[T]:
         return RelationalPartialDataSheet[T](self.__t_cls, self, _range, _file)
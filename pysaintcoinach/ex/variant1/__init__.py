@@ -66,9 +66,9 @@ class RelationalDataRow(DataRow, IRelationalDataRow):
         if 'column_index' in kwargs:
             return super(RelationalDataRow, self).get_raw(**kwargs)
         if isinstance(column_name, int):
-            return super(RelationalDataRow, self).get_raw(column_name)
+            return super(RelationalDataRow, self).get_raw(column_name, **kwargs)
 
         column = self.sheet.header.find_column(column_name)
         if column is None:
             raise KeyError(column_name)
-        return column.read_raw(self.sheet.get_buffer(), self)
+        return super(RelationalDataRow, self).get_raw(column.index, **kwargs)
@@ -40,12 +40,12 @@ class SubRow(DataRowBase, IRelationalDataRow):
         if 'column_index' in kwargs:
             return super(SubRow, self).get_raw(**kwargs)
         if isinstance(column_name, int):
-            return super(SubRow, self).get_raw(column_name)
+            return super(SubRow, self).get_raw(column_name, **kwargs)
 
         column = self.sheet.header.find_column(column_name)
         if column is None:
             raise KeyError
-        return self.get_raw(column.index)
+        return self.get_raw(column.index, **kwargs)
 
 
 class DataRow(DataRowBase):
@@ -89,19 +89,40 @@ class ExdHelper(object):
             multi_row = cast(IMultiRow, use_row)
 
             row_line = [write_key(use_row)]
-            for col in col_indices:
-                if language == Language.none or multi_row is None:
-                    v = use_row.get_raw(col) if write_raw else use_row[col]
-                else:
-                    v = multi_row.get_raw(col, language) if write_raw else multi_row[(col, language)]
+            data_row = ExdHelper._get_data_row(use_row, language)
+            if data_row is not None:
+                # Every column of the row is read at once.
+                values = data_row.raw_values() if write_raw else list(data_row.column_values())
+                row_line.extend(values[col] for col in col_indices)
+            else:
+                for col in col_indices:
+                    if language == Language.none or multi_row is None:
+                        v = use_row.get_raw(col) if write_raw else use_row[col]
+                    else:
+                        v = multi_row.get_raw(col, language) if write_raw else multi_row[(col, language)]
 
-                row_line.append(v)
+                    row_line.append(v)
 
             writer.writerow(row_line)
 
             if tracker is not None:
                 tracker.update()
 
+    @staticmethod
+    def _get_data_row(row: IRow, language: Language):
+        # The row holding the data of the given language, if it's read from
+        # a data sheet directly.
+        from .ex.datasheet import DataRowBase
+        from .ex.multisheet import MultiRow
+
+        if isinstance(row, MultiRow):
+            sheet = row.sheet
+            localised = sheet.active_sheet if language == Language.none else sheet.get_localised_sheet(language)
+            row = localised[row.key]
+        elif language != Language.none:
+            return None
+        return row if isinstance(row, DataRowBase) else None
+
     @staticmethod
     def convert_rows(sheet: ISheet, language: Language = Language.none, cols = None):
         if cols is None:
@@ -0,0 +1,306 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from pathlib import Path
+from queue import Queue
+from threading import Lock, Thread
+from typing import Callable, Iterable, List, Optional, Tuple, Union
+import logging
+import os
+
+from .file import File
+from .imaging import ImageFile
+from .pack import Pack, PackCollection
+
+
+logger = logging.getLogger(__name__)
+
+# Called with the number of files done, the total and the path last done.
+Progress = Callable[[int, int, str], None]
+
+
+class Extractor(object):
+    """
+    Bulk extraction of files from a pack collection to a directory.
+
+    Files are read in the order they are stored in the dat files and
+    inflated on a pool of `max_workers` threads, while a separate thread
+    writes them out from a queue of at most `queue_size` files.
+
+    With `skip_existing`, files already present in the target directory are
+    left alone. With `resume`, only the files written by an interrupted
+    extraction of the same game version are skipped; the record of those
+    is removed once an extraction completes without failures.
+
+    Files of types that aren't supported are counted as skipped, and files
+    that can't be read or written as failed; neither stops the extraction.
+    """
+
+    DEFAULT_QUEUE_SIZE = 64
+    JOURNAL_FILE = '.extract-journal'
+
+    @property
+    def packs(self) -> PackCollection: return self._packs
+
+    @property
+    def target(self) -> Path: return self._target
+
+    @property
+    def written(self) -> int: return self._written
+
+    @property
+    def skipped(self) -> int: return self._skipped
+
+    @property
+    def missing(self) -> int: return self._missing
+
+    @property
+    def failed(self) -> int: return self._failed
+
+    def __init__(self,
+                 packs: PackCollection,
+                 target: Union[str, Path],
+                 max_workers: int = None,
+                 queue_size: int = DEFAULT_QUEUE_SIZE,
+                 skip_existing: bool = False,
+                 resume: bool = False):
+        self._packs = packs
+        self._target = Path(target)
+        self._max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+        self._queue_size = queue_size
+        self._skip_existing = skip_existing
+        self._resume = resume
+        self._written = 0
+        self._skipped = 0
+        self._missing = 0
+        self._failed = 0
+        self._lock = Lock()
+
+    def extract_paths(self, paths: Iterable[str], progress: Progress = None) -> int:
+        """
+        Extract the files at the given paths, returning the number written.
+        """
+        items = []
+        for path in paths:
+            try:
+                file = self.packs.get_file(path)
+            except TypeError as e:
+                logger.info('Skipping %s: %s' % (path, e))
+                self._skipped += 1
+                continue
+            except KeyError:
+                # Missing from a pack that only has an index2 file.
+                logger.error('Unable to find %s' % path)
+                self._failed += 1
+                continue
+            if file is None:
+                logger.warning('File not found: %s' % path)
+                self._missing += 1
+            else:
+                items.append((path, file))
+        return self._run(items, progress)
+
+    def extract_pack(self, pack: Union[str, Pack], progress: Progress = None) -> int:
+        """
+        Extract every file of a pack, given as the pack or a path inside it.
+
+        Files are written under their path if the collection's name
+        dictionary knows it, or else under the pack and their keys.
+        """
+        if not isinstance(pack, Pack):
+            pack = self.packs.get_pack(pack)
+        if pack is None:
+            raise FileNotFoundError
+        # Packs are iterated in dat order, reading the header of every file.
+        with pack.scan():
+            items = [(_get_target_path(file), file) for file in pack]
+        return self._run(items, progress)
+
+    def extract_directory(self, prefix: str, progress: Progress = None) -> int:
+        """
+        Extract every file below a directory.
+
+        All paths known to the name dictionary that start with `prefix` are
+        extracted. Without a name dictionary, only the files directly in that
+        directory are, named by their keys.
+        """
+        prefix = prefix.rstrip('/')
+        names = self.packs.name_dictionary
+        if names is not None:
+            return self.extract_paths(names.get_file_paths(prefix + '/'), progress)
+
+        # Import here to prevent mutual dependency.
+        from .indexfile import IndexSource
+
+        pack = self.packs.get_pack(prefix + '/')
+        if pack is None or not isinstance(pack.source, IndexSource):
+            raise FileNotFoundError(prefix)
+        directory = pack.source.get_directory(prefix)
+        if directory is None:
+            raise FileNotFoundError(prefix)
+        return self._run([('%s/%08X' % (directory.path, file.index.file_key), file) for file in directory],
+                         progress)
+
+    def extract_files(self, items: Iterable[Tuple[str, File]], progress: Progress = None) -> int:
+        """
+        Extract the given files, each under the path it's paired with.
+        """
+        return self._run(list(items), progress)
+
+    def _run(self, items: List[Tuple[str, File]], progress: Optional[Progress]) -> int:
+        items.sort(key=lambda i: _get_location(i[1]))
+        journal_path = self.target.joinpath(self.JOURNAL_FILE)
+        done = self.__read_journal(journal_path) if self._resume else set()
+
+        queue = Queue(self._queue_size)
+        written = [0]
+        journal = None
+        if self._resume:
+            self.target.mkdir(parents=True, exist_ok=True)
+            journal = journal_path.open('w' if len(done) == 0 else 'a', encoding='utf-8')
+            if len(done) == 0:
+                journal.write(self.packs.game_version + '\n')
+
+        # Files written, skipped or failed so far; updated from both threads.
+        count = [0]
+        failed = self._failed
+
+        def report(path: str, outcome: str = None):
+            with self._lock:
+                if outcome == 'skipped':
+                    self._skipped += 1
+                elif outcome == 'failed':
+                    self._failed += 1
+                count[0] += 1
+                if progress is not None:
+                    progress(count[0], len(items), path)
+
+        # Unexpected errors of the writer, raised again by the producer.
+        errors = []
+
+        def write_one(path: str, data: bytes):
+            try:
+                _write(self.target.joinpath(path), data)
+                written[0] += 1
+                if journal is not None:
+                    journal.write(path + '\n')
+                    journal.flush()
+            except OSError as e:
+                logger.error('Unable to write %s: %s' % (path, e))
+                report(path, 'failed')
+                return
+            report(path)
+
+        def write():
+            while True:
+                entry = queue.get()
+                if entry is None:
+                    break
+                # After an error the queue is only drained, so that the
+                # producer never blocks on it.
+                if not errors:
+                    try:
+                        write_one(*entry)
+                    except Exception as e:
+                        errors.append(e)
+
+        def check_writer():
+            if errors:
+                raise errors[0]
+
+        writer = Thread(target=write, name='extract-writer', daemon=True)
+        writer.start()
+        completed = False
+        try:
+            with ExitStack() as stack, \
+                    ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix='extract') as executor:
+                for pack in {file.pack for _, file in items if isinstance(file.pack, Pack)}:
+                    stack.enter_context(pack.scan())
+
+                # Bounds the number of inflated files waiting to be queued.
+                in_flight = deque()
+                for path, file in items:
+                    if path in done or (self._skip_existing and self.target.joinpath(path).exists()):
+                        report(path, 'skipped')
+                    else:
+                        in_flight.append((path, executor.submit(_read, file)))
+                        if len(in_flight) > self._max_workers * 2:
+                            self.__queue(queue, report, *in_flight.popleft())
+                            check_writer()
+                while in_flight:
+                    self.__queue(queue, report, *in_flight.popleft())
+                    check_writer()
+            completed = True
+        finally:
+            queue.put(None)
+            writer.join()
+            if journal is not None:
+                journal.close()
+                if completed and not errors and self._failed == failed:
+                    journal_path.unlink()
+        check_writer()
+
+        self._written += written[0]
+        return written[0]
+
+    def __queue(self, queue: Queue, report: Callable[[str, str], None], path: str, future):
+        try:
+            data = future.result()
+        except TypeError as e:
+            # Files of types that aren't supported.
+            logger.info('Skipping %s: %s' % (path, e))
+            report(path, 'skipped')
+            return
+        except Exception as e:
+            logger.error('Unable to read %s: %s' % (path, e))
+            report(path, 'failed')
+            return
+        queue.put((path, data))
+
+    def __read_journal(self, path: Path) -> set:
+        # Paths written by an interrupted run for the same game version.
+        if not path.exists():
+            return set()
+        lines = path.read_text(encoding='utf-8').splitlines()
+        if len(lines) == 0 or lines[0] != self.packs.game_version:
+            return set()
+        logger.info('Resuming extraction after %u files' % (len(lines) - 1))
+        return set(lines[1:])
+
+
+def _get_location(file: File) -> tuple:
+    # Files outside of any pack, from overlays, come first.
+    if file.index is None:
+        return 0, 0, 0, 0
+    return 1, hash(file.pack.id), file.index.dat_file, file.index.offset
+
+
+def _get_target_path(file: File) -> str:
+    index = file.index
+    directory_key = getattr(index, 'directory_key', None)
+    names = file.pack.name_dictionary
+    path = names.get_file_path(directory_key, index.file_key) if names is not None else None
+    if path is not None:
+        return path
+    if directory_key is None:
+        return '%s/%08X' % (file.pack, index.file_key)
+    return '%s/%08X/%08X' % (file.pack, directory_key, index.file_key)
+
+
+def _read(file: File):
+    # Read past the caches, which would only be churned by a bulk extraction.
+    data = file._read()
+    if isinstance(file, ImageFile):
+        # Written as .tex files, starting with their image header, the way
+        # loose file storage reads them back.
+        return file.image_header.get_buffer() + data
+    return data
+
+
+def _write(path: Path, data: bytes):
+    if not path.parent.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+    # Written aside and renamed, so an interrupted run leaves no partial files.
+    temp_path = path.with_name(path.name + '.tmp')
+    temp_path.write_bytes(data)
+    os.replace(temp_path, path)
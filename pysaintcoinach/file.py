@@ -1,14 +1,36 @@
 from abc import ABC, abstractmethod
+from bisect import bisect_right
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
+from threading import Lock
+from typing import Iterable, List, Optional, Tuple
 import io
 import struct
 import zlib
 import weakref
 import logging
 
+from . import aio
+
 
 logger = logging.getLogger(__name__)
 
+_inflate_executor = None  # type: ThreadPoolExecutor
+_inflate_executor_lock = Lock()
+
+
+def get_inflate_executor() -> ThreadPoolExecutor:
+    """
+    Get the thread pool shared by all parallel block inflation.
+    """
+    global _inflate_executor
+    if _inflate_executor is None:
+        with _inflate_executor_lock:
+            if _inflate_executor is None:
+                _inflate_executor = ThreadPoolExecutor(thread_name_prefix='inflate')
+    return _inflate_executor
+
 
 class FileType(Enum):
     Unknown = 0
@@ -23,10 +45,7 @@ class FileFactory(object):
     def get(pack, file):
         from .imaging import ImageFile
 
-        stream = pack.get_data_stream(file.dat_file)
-        stream.seek(file.offset)
-
-        header = FileCommonHeader(file, stream)
+        header = FileCommonHeader(file, pack)
         FILE_FACTORY_INIT_MAP = {
             FileType.Empty.value: EmptyFile,
             FileType.Default.value: FileDefault,
@@ -51,41 +70,51 @@ class FileCommonHeader(object):
 
     def __len__(self): return self._length
 
-    def __init__(self, index, stream):
+    def __init__(self, index, pack):
         if index is None:
             raise ValueError('index')
-        if stream is None:
-            raise ValueError('stream')
+        if pack is None:
+            raise ValueError('pack')
 
         self._buffer = b''
 
         self._index = index
 
-        self.__read(stream)
+        self.__read(pack)
 
     def get_buffer(self):
         return self._buffer
 
-    def __read(self, stream: io.RawIOBase):
+    def __read(self, pack):
         FILE_TYPE_OFFSET = 0x04
         FILE_LENGTH_OFFSET = 0x10
         FILE_LENGTH_SHIFT = 7
 
-        self._buffer = stream.read(4)
+        # Enough for the headers of most files; longer ones are read again.
+        PROBE_LENGTH = 0x400
 
-        length, = struct.unpack_from('<l', self._buffer, 0)
-
-        remaining = length - 4
+        # With a mapped dat file these are slices of the mapping, not copies.
+        probe = pack.read_data(self.index.dat_file, self.index.offset, PROBE_LENGTH)
+        if len(probe) < 4:
+            raise EOFError
+        length, = struct.unpack_from('<l', probe, 0)
 
-        self._buffer += stream.read(remaining)
+        if length <= len(probe):
+            self._buffer = probe[:length]
+        else:
+            self._buffer = pack.read_data(self.index.dat_file, self.index.offset, length)
+        if len(self._buffer) != length:
+            raise EOFError
 
         self._file_type, = struct.unpack_from('<l', self._buffer, FILE_TYPE_OFFSET)
         self._length = struct.unpack_from('<l', self._buffer, FILE_LENGTH_OFFSET)[0] << FILE_LENGTH_SHIFT
 
-        self._end_of_header = stream.tell()
+        self._end_of_header = self.index.offset + length
 
 
 class File(ABC):
+    __slots__ = ('_pack', '_index', '_path', '_common_header', '_image_header', '_image_cache', '__weakref__')
+
     @property
     def pack(self): return self._pack
 
@@ -93,12 +122,16 @@ class File(ABC):
     def common_header(self) -> FileCommonHeader: return self._common_header
 
     @property
-    def index(self): return self.common_header.index
+    def index(self): return self._index
 
     @property
     def path(self):
         if self._path is None:
-            return "%08X" % self.index.file_key
+            names = self.pack.name_dictionary
+            if names is not None:
+                self._path = names.get_file_path(getattr(self.index, 'directory_key', None), self.index.file_key)
+            if self._path is None:
+                return "%08X" % self.index.file_key
         return self._path
 
     @path.setter
@@ -108,6 +141,9 @@ class File(ABC):
         self._path = None
         self._pack = pack
         self._common_header = common_header
+        self._index = common_header.index if common_header is not None else None
+        self._image_header = None
+        self._image_cache = None
 
     def __str__(self):
         return self.path
@@ -115,24 +151,161 @@ class File(ABC):
     def __repr__(self):
         return "File(%s)" % self.path
 
-    @abstractmethod
     def get_data(self):
+        """
+        Get the decompressed data of the file, as bytes.
+
+        Data is kept in the pack's data cache, shared with any other file at
+        the same location, and read again once it has been evicted; from the
+        spill cache if the collection has one, or else from the dat file.
+        """
+        cache = self.pack.data_cache
+        key = self._get_cache_key()
+        data = cache.get(key)
+        if data is None:
+            spill_cache = self.pack.spill_cache
+            if spill_cache is not None:
+                spill_key = self._get_spill_key()
+                data = spill_cache.get(spill_key)
+            if data is None:
+                logger.info('Getting data for: %s' % self.path)
+                data = self._read()
+                if spill_cache is not None:
+                    spill_cache.put(spill_key, data)
+            cache.put(key, data)
+        return data
+
+    async def aget_data(self):
+        """
+        Coroutine version of `get_data`, run on the shared executor.
+        """
+        # Keyed by the pack object, not just its identifier, so that files of
+        # different collections never share a read.
+        return await aio.run((self.pack, 'data') + self._get_cache_key(), self.get_data)
+
+    def pin(self):
+        """
+        Keep the data of this file in the pack's data cache until unpinned.
+        """
+        self.pack.data_cache.pin(self._get_cache_key())
+
+    def unpin(self):
+        self.pack.data_cache.unpin(self._get_cache_key())
+
+    def _get_cache_key(self):
+        # Keyed by location rather than by path, so that every index entry
+        # pointing at the same data shares one decompressed copy.
+        return self.pack.id, self.index.dat_file, self.index.offset
+
+    def _get_spill_key(self):
+        return hash(self.pack.id), self.index.dat_file, self.index.offset
+
+    @abstractmethod
+    def _read(self):
         pass
 
+    def _get_block_offsets(self) -> List[int]:
+        """
+        Get the dat offsets of the data blocks of the file, in order.
+        """
+        return []
+
+    def _get_data_size(self) -> int:
+        return 0
+
+    def _get_blocks_end(self) -> Optional[int]:
+        """
+        Get the dat offset at which the last data block of the file ends, if
+        the header tells.
+        """
+        return None
+
     def get_stream(self):
         return io.BytesIO(self.get_data())
 
+    def open(self, cached_blocks: int = None) -> 'BlockStream':
+        """
+        Open a seekable, read-only stream over the data of the file.
+
+        Unlike `get_stream`, only the blocks covering the ranges actually
+        read are inflated.
+        """
+        if cached_blocks is None:
+            cached_blocks = BlockStream.DEFAULT_CACHED_BLOCKS
+        return BlockStream(self, cached_blocks)
+
     def _get_source_stream(self) -> io.RawIOBase:
         return self.pack.get_data_stream(self.index.dat_file)
 
-    @staticmethod
-    def _read_block(stream):
-        with io.BytesIO() as out_stream:
-            File._read_block_into(stream, out_stream)
-            return out_stream.getvalue()
+    def _read_source(self, offset: int, length: int):
+        return self.pack.read_data(self.index.dat_file, offset, length)
+
+    def _read_blocks(self, offsets: Iterable[int], length: int = 0, truncate: bool = False) -> bytes:
+        """
+        Read the blocks at the given dat offsets, in order, into one buffer.
+
+        The inflated blocks are joined into the result with a single copy.
+        Unless `truncate` is set, the result is padded with zeros up to
+        `length` bytes.
+
+        Blocks of files at least as large as the pack's parallel inflate
+        threshold are read and inflated concurrently on a shared thread pool.
+        """
+        offsets = list(offsets)
+        if len(offsets) > 1:
+            # Point lookups are hinted as random access, so ask for the whole
+            # file up front instead of block by block.
+            end = self._get_blocks_end()
+            if end is not None:
+                self.pack.will_need(self.index.dat_file, offsets[0], end - offsets[0])
+        threshold = self.pack.parallel_inflate_threshold
+        if threshold is None or len(offsets) < 2 or len(self.common_header) < threshold:
+            blocks = map(self._read_block, offsets)
+        else:
+            blocks = get_inflate_executor().map(self._read_block, offsets)
+
+        blocks = list(blocks)
+        padding = 0 if truncate else length - sum(map(len, blocks))
+        if padding > 0:
+            blocks.append(bytes(padding))
+        return b''.join(blocks)
+
+    def _read_block(self, offset: int) -> bytes:
+        HEADER_LENGTH = 0x10
+
+        # Blocks hold at most 16000 bytes of data, so most are read in one go
+        # along with their header; only larger ones are read again.
+        PROBE_LENGTH = HEADER_LENGTH + 0x4000
+
+        probe = self._read_source(offset, PROBE_LENGTH)
+        is_compressed, block_size, raw_size = self._parse_block_header(probe[:HEADER_LENGTH])
+
+        if HEADER_LENGTH + block_size <= len(probe):
+            buffer = probe[HEADER_LENGTH:HEADER_LENGTH + block_size]
+        else:
+            buffer = self._read_source(offset + HEADER_LENGTH, block_size)
+        if len(buffer) != block_size:
+            raise EOFError
+
+        if is_compressed:
+            buffer = zlib.decompress(buffer, -15, raw_size)
+            if raw_size != len(buffer):
+                raise RuntimeError("Inflated block does not match indicated size")
+        return buffer
+
+    def _read_block_header(self, offset: int) -> Tuple[bool, int, int]:
+        """
+        Read the header of the block at a dat offset.
+
+        Returns whether the block is compressed, the length of its data in the
+        dat file and its inflated length.
+        """
+        HEADER_LENGTH = 0x10
+
+        return self._parse_block_header(self._read_source(offset, HEADER_LENGTH))
 
     @staticmethod
-    def _read_block_into(in_stream: io.RawIOBase, out_stream: io.RawIOBase):
+    def _parse_block_header(header) -> Tuple[bool, int, int]:
         MAGIC = 0x00000010
 
         HEADER_LENGTH = 0x10
@@ -155,7 +328,6 @@ class File(ABC):
         # 4h    Raw size
         # -> If size in source >= 7D00h then data is uncompressed
 
-        header = in_stream.read(HEADER_LENGTH)
         if len(header) != HEADER_LENGTH:
             raise EOFError
 
@@ -173,16 +345,7 @@ class File(ABC):
         if is_compressed and ((block_size + HEADER_LENGTH) % BLOCK_PADDING) != 0:
             block_size += BLOCK_PADDING - ((block_size + HEADER_LENGTH) % BLOCK_PADDING)
 
-        buffer = in_stream.read(block_size)
-        if len(buffer) != block_size:
-            raise EOFError
-
-        if is_compressed:
-            current_position = out_stream.tell()
-            if raw_size != out_stream.write(zlib.decompress(buffer, -15)):
-                raise RuntimeError("Inflated block does not match indicated size")
-        else:
-            out_stream.write(buffer)
+        return is_compressed, block_size, raw_size
 
     def __hash__(self):
         return hash(self.index)
@@ -193,44 +356,203 @@ class File(ABC):
         return False
 
 
+class FileCache(object):
+    """
+    Cache of file objects that holds on to the most recently used ones, and
+    to the others only for as long as they're referenced elsewhere.
+    """
+
+    DEFAULT_SIZE = 0x400
+
+    def __init__(self, size: int = DEFAULT_SIZE):
+        self._size = size
+        self._recent = OrderedDict()  # type: OrderedDict[object, File]
+        self._files = weakref.WeakValueDictionary()  # type: weakref.WeakValueDictionary[object, File]
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._files)
+
+    def get(self, key) -> Optional['File']:
+        with self._lock:
+            file = self._files.get(key, None)
+            if file is not None:
+                self._recent[key] = file
+                self._recent.move_to_end(key)
+                self.__trim()
+            return file
+
+    def add(self, key, file: 'File') -> 'File':
+        """
+        Add a file, unless one was already added for the key; returns the
+        file that is cached.
+        """
+        with self._lock:
+            cached = self._files.get(key, None)
+            if cached is not None:
+                return cached
+            self._files[key] = file
+            self._recent[key] = file
+            self.__trim()
+            return file
+
+    def clear(self):
+        with self._lock:
+            self._recent.clear()
+            self._files.clear()
+
+    def __trim(self):
+        while len(self._recent) > self._size:
+            self._recent.popitem(last=False)
+
+
 class EmptyFile(File):
+    __slots__ = ()
+
     def __init__(self, pack, header):
         super().__init__(pack, header)
 
     def get_data(self):
         return b''
 
+    def _read(self):
+        return b''
+
+
+class BlockStream(io.RawIOBase):
+    """
+    Seekable, read-only stream over the data of a file that inflates blocks
+    on demand.
+
+    Block headers are only read as far as needed to locate a position, and
+    the most recently used inflated blocks are kept.
+    """
+
+    DEFAULT_CACHED_BLOCKS = 4
+
+    @property
+    def file(self) -> File: return self._file
+
+    def __init__(self, file: File, cached_blocks: int = DEFAULT_CACHED_BLOCKS):
+        super().__init__()
+        self._file = file
+        self._offsets = file._get_block_offsets()
+        self._size = file._get_data_size()
+        self._position = 0
+        # Data position at which each block whose header was read starts,
+        # followed by where the last of them ends.
+        self._starts = [0]
+        self._cached_blocks = cached_blocks
+        self._blocks = OrderedDict()  # type: OrderedDict[int, bytes]
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self._size + offset
+        else:
+            raise ValueError('whence')
+        if position < 0:
+            raise ValueError('negative seek position %d' % position)
+        self._position = position
+        return position
+
+    def readinto(self, b):
+        view = memoryview(b).cast('B')
+        count = max(0, min(len(view), self._size - self._position))
+        written = 0
+        while written < count:
+            index = self._find_block(self._position)
+            if index is None:
+                # Past the last block, the data is zero padding.
+                view[written:count] = bytes(count - written)
+                self._position += count - written
+                written = count
+                break
+
+            block = self._get_block(index)
+            start = self._position - self._starts[index]
+            length = min(len(block) - start, count - written)
+            view[written:written + length] = block[start:start + length]
+            written += length
+            self._position += length
+        return written
+
+    def _find_block(self, position: int) -> Optional[int]:
+        starts = self._starts
+        while starts[-1] <= position and len(starts) <= len(self._offsets):
+            _, _, raw_size = self._file._read_block_header(self._offsets[len(starts) - 1])
+            starts.append(starts[-1] + raw_size)
+        if position >= starts[-1]:
+            return None
+        return bisect_right(starts, position) - 1
+
+    def _get_block(self, index: int) -> bytes:
+        block = self._blocks.get(index, None)
+        if block is not None:
+            self._blocks.move_to_end(index)
+            return block
+
+        block = self._file._read_block(self._offsets[index])
+        self._blocks[index] = block
+        while len(self._blocks) > self._cached_blocks:
+            self._blocks.popitem(last=False)
+        return block
+
+    def close(self):
+        self._blocks.clear()
+        super().close()
+
 
 class FileDefault(File):
+    __slots__ = ()
+
     def __init__(self, pack, header):
         super().__init__(pack, header)
-        self._buffer_cache = None
 
-    def get_data(self):
-        if self._buffer_cache is not None:
-            return self._buffer_cache
+    def _read(self):
+        return self._read_blocks(self._get_block_offsets(), self._get_data_size())
 
-        logger.info('Getting data for: %s' % self.path)
-        buffer = self.__read()
+    def _get_block_offsets(self) -> List[int]:
+        BLOCK_COUNT_OFFSET = 0x14
+        BLOCK_INFO_OFFSET = 0x18
+        BLOCK_INFO_LENGTH = 0x08
 
-        self._buffer_cache = buffer
+        block_count, = struct.unpack_from('<h', self.common_header._buffer, BLOCK_COUNT_OFFSET)
 
-        return buffer
+        offsets = []
+        for i in range(0, block_count):
+            block_offset, = struct.unpack_from('<l',
+                                               self.common_header._buffer,
+                                               BLOCK_INFO_OFFSET + i * BLOCK_INFO_LENGTH)
+            offsets.append(self.common_header.end_of_header + block_offset)
+        return offsets
 
-    def __read(self):
+    def _get_blocks_end(self) -> int:
         BLOCK_COUNT_OFFSET = 0x14
         BLOCK_INFO_OFFSET = 0x18
         BLOCK_INFO_LENGTH = 0x08
+        BLOCK_SIZE_OFFSET = 0x04
 
-        source_stream = self._get_source_stream()
         block_count, = struct.unpack_from('<h', self.common_header._buffer, BLOCK_COUNT_OFFSET)
-
-        with io.BytesIO(b'\0' * len(self.common_header)) as data_stream:
-            for i in range(0, block_count):
-                block_offset, = struct.unpack_from('<l',
-                                                   self.common_header._buffer,
-                                                   BLOCK_INFO_OFFSET + i * BLOCK_INFO_LENGTH)
-                source_stream.seek(self.common_header.end_of_header + block_offset)
-                File._read_block_into(source_stream, data_stream)
-
-            return data_stream.getvalue()
+        if block_count == 0:
+            return self.common_header.end_of_header
+        info_offset = BLOCK_INFO_OFFSET + (block_count - 1) * BLOCK_INFO_LENGTH
+        block_offset, = struct.unpack_from('<l', self.common_header._buffer, info_offset)
+        block_size, = struct.unpack_from('<H', self.common_header._buffer, info_offset + BLOCK_SIZE_OFFSET)
+        return self.common_header.end_of_header + block_offset + block_size
+
+    def _get_data_size(self) -> int:
+        # The data is padded to the length given in the common header.
+        return len(self.common_header)
@@ -1,15 +1,15 @@
 import weakref
-import io
 import struct
 from enum import Enum
 from io import StringIO, BytesIO
-from typing import Iterable, List, Callable, Dict
+from typing import List, Callable, Dict, Tuple
 
 from PIL import Image
 
 from ..file import File, FileCommonHeader
 from ..indexfile import Directory
 from ..pack import Pack
+from ..storage import LooseFile
 from .iconhelper import IconHelper
 
 
@@ -52,14 +52,15 @@ class ImageHeader(object):
     def end_of_header(self) -> int:
         return self.__end_of_header
 
-    def __init__(self, stream: io.RawIOBase):
-        LENGTH = 0x50
+    LENGTH = 0x50
+
+    def __init__(self, buffer: bytes, offset: int):
         FORMAT_OFFSET = 0x04
         WIDTH_OFFSET = 0x08
         HEIGHT_OFFSET = 0x0A
 
-        self._buffer = stream.read(LENGTH)
-        if len(self._buffer) != LENGTH:
+        self._buffer = buffer
+        if len(self._buffer) != self.LENGTH:
             raise EOFError
 
         (self.__width,) = struct.unpack_from("<h", self._buffer, WIDTH_OFFSET)
@@ -67,16 +68,20 @@ class ImageHeader(object):
         self.__imgformat = ImageFormat(
             struct.unpack_from("<h", self._buffer, FORMAT_OFFSET)[0]
         )
-        self.__end_of_header = stream.tell()
+        self.__end_of_header = offset + self.LENGTH
 
     def get_buffer(self) -> bytes:
         return bytes(self._buffer)
 
 
 class ImageFile(File):
+    __slots__ = ()
+
     @property
     def image_header(self) -> ImageHeader:
-        return self.__image_header
+        if self._image_header is None:
+            self._image_header = self._read_image_header()
+        return self._image_header
 
     @property
     def width(self) -> int:
@@ -92,51 +97,54 @@ class ImageFile(File):
 
     def __init__(self, pack: Pack, common_header: FileCommonHeader):
         super(ImageFile, self).__init__(pack, common_header)
-        self.__buffer_cache = None  # type: bytes
-        self.__image_cache = None  # type: object
-        stream = self._get_source_stream()
-        stream.seek(common_header.end_of_header)
-        self.__image_header = ImageHeader(stream)
+
+    def _read_image_header(self) -> ImageHeader:
+        return ImageHeader(
+            self._read_source(self.common_header.end_of_header, ImageHeader.LENGTH),
+            self.common_header.end_of_header,
+        )
 
     def get_image(self) -> Image.Image:
-        if self.__image_cache is not None:
-            return self.__image_cache
+        if self._image_cache is not None:
+            return self._image_cache
 
         image = ImageConverter.convert(self)
 
-        # self.__image_cache = weakref.proxy(image)
-        self.__image_cache = image
+        # self._image_cache = weakref.proxy(image)
+        self._image_cache = image
         return image
 
-    def get_data(self) -> bytes:
-        if self.__buffer_cache is not None:
-            return self.__buffer_cache
+    def _read(self) -> bytes:
+        return self._read_blocks(self._get_block_offsets(), self._get_data_size(), truncate=True)
+
+    def _get_data_size(self) -> int:
+        COUNT_OFFSET = 0x14
+        ENTRY_LENGTH = 0x14
+        BLOCK_INFO_OFFSET = 0x18
+        DECOMPRESSED_SIZE_OFFSET = 0x08
 
-        buffer = self._read()
+        (count,) = struct.unpack_from("<h", self.common_header._buffer, COUNT_OFFSET)
+        length = 0
+        for i in range(count):
+            (size,) = struct.unpack_from("<l", self.common_header._buffer,
+                                         BLOCK_INFO_OFFSET + i * ENTRY_LENGTH + DECOMPRESSED_SIZE_OFFSET)
+            length += size
+        return length
 
-        self.__buffer_cache = buffer
+    def _get_block_offsets(self) -> List[int]:
+        return self.__get_block_layout()[0]
 
-        return buffer
+    def _get_blocks_end(self) -> int:
+        return self.__get_block_layout()[1]
 
-    def _read(self) -> bytes:
-        source_stream = self._get_source_stream()
-        offsets = self._get_block_offsets()
-
-        data = b""
-        with io.BytesIO() as data_stream:
-            for offset in offsets:
-                source_stream.seek(self.image_header.end_of_header + offset)
-                self._read_block_into(source_stream, data_stream)
-            data = data_stream.getvalue()
-        return data
-
-    def _get_block_offsets(self) -> Iterable[int]:
+    def __get_block_layout(self) -> Tuple[List[int], int]:
+        # The dat offsets of the blocks, and where the last of them ends.
         COUNT_OFFSET = 0x14
         ENTRY_LENGTH = 0x14
         BLOCK_INFO_OFFSET = 0x18
 
         (count,) = struct.unpack_from("<h", self.common_header._buffer, COUNT_OFFSET)
-        current_offset = 0
+        current_offset = self.image_header.end_of_header
         offsets = []  # type: List[int]
 
         i = BLOCK_INFO_OFFSET + count * ENTRY_LENGTH
@@ -148,7 +156,22 @@ class ImageFile(File):
             current_offset += _len
             i += 2
 
-        return offsets
+        return offsets, current_offset
+
+
+class LooseImageFile(LooseFile, ImageFile):
+    """
+    Texture stored already decompressed, starting with its image header.
+    """
+
+    def __init__(self, storage, path: str, loader):
+        LooseFile.__init__(self, storage, path, loader)
+
+    def _read_image_header(self) -> ImageHeader:
+        return ImageHeader(self._loader(0, ImageHeader.LENGTH), 0)
+
+    def _read(self):
+        return self._loader(ImageHeader.LENGTH, -1)
 
 
 class _ImageConverter(object):
@@ -0,0 +1,155 @@
+from array import array
+from pathlib import Path
+from typing import Dict, Optional, Union
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import sys
+
+
+logger = logging.getLogger(__name__)
+
+# magic, format version, section count
+_HEADER = struct.Struct('<8sLL')
+# name, type code, item size, offset, item count
+_SECTION = struct.Struct('<8scxxxLQQ')
+_ALIGNMENT = 8
+
+
+def pack_sections(magic: bytes, version: int, sections: Dict[str, array]) -> bytes:
+    """
+    Serialize a set of named arrays (or memoryviews) into one buffer.
+
+    Names are at most eight bytes long, and every array is aligned so it
+    can be cast back in place.
+    """
+    header = bytearray(_HEADER.pack(magic, version, len(sections)))
+    body = bytearray()
+    body_offset = _HEADER.size + _SECTION.size * len(sections)
+    for name, values in sections.items():
+        type_code = values.typecode if isinstance(values, array) else values.format
+        padding = -(body_offset + len(body)) % _ALIGNMENT
+        body += b'\0' * padding
+        header += _SECTION.pack(name.encode(),
+                                type_code.encode(),
+                                values.itemsize,
+                                body_offset + len(body),
+                                len(values))
+        body += values.tobytes()
+    return bytes(header + body)
+
+
+def unpack_sections(view: memoryview, magic: bytes, version: int) -> Optional[Dict[str, memoryview]]:
+    """
+    Get the named arrays of a buffer written by `pack_sections`, as views
+    into the buffer.
+
+    Returns None if the buffer has another magic or version, or was written
+    on a platform with different item sizes.
+    """
+    file_magic, file_version, count = _HEADER.unpack_from(view, 0)
+    if file_magic != magic or file_version != version:
+        return None
+
+    sections = {}
+    position = _HEADER.size
+    for _ in range(count):
+        name, type_code, item_size, offset, length = _SECTION.unpack_from(view, position)
+        position += _SECTION.size
+        type_code = type_code.decode()
+        if struct.calcsize(type_code) != item_size:
+            return None
+        sections[name.rstrip(b'\0').decode()] = \
+            view[offset:offset + length * item_size].cast(type_code)
+    return sections
+
+
+class IndexCache(object):
+    """
+    On-disk cache of parsed SqPack index tables.
+
+    Entries are keyed by the index file's path, size and modification time,
+    and by the game version, so a patched or replaced index is never served
+    from a stale entry. Each entry holds a set of named arrays which are
+    memory-mapped back in when loaded.
+    """
+
+    MAGIC = b'SCIXCACH'
+    FORMAT_VERSION = 1
+
+    @property
+    def directory(self) -> Path: return self._directory
+
+    @property
+    def game_version(self) -> str: return self._game_version
+
+    def __init__(self, directory: Union[str, Path], game_version: str = ''):
+        self._directory = Path(directory)
+        self._game_version = game_version
+        self._directory.mkdir(parents=True, exist_ok=True)
+
+    def _get_entry_path(self, path: str) -> Optional[Path]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        key = '|'.join([os.path.abspath(path),
+                        str(stat.st_size),
+                        str(stat.st_mtime_ns),
+                        self.game_version,
+                        sys.byteorder,
+                        str(self.FORMAT_VERSION)])
+        return self.directory.joinpath(hashlib.sha1(key.encode()).hexdigest() + '.idx')
+
+    def load(self, path: str) -> Optional[Dict[str, memoryview]]:
+        """
+        Get the cached sections for an index file, or None if there are none.
+        """
+        entry_path = self._get_entry_path(path)
+        if entry_path is None or not entry_path.exists():
+            return None
+
+        try:
+            with entry_path.open(mode='rb') as f:
+                view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            sections = unpack_sections(view, self.MAGIC, self.FORMAT_VERSION)
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning('Ignoring unreadable index cache entry %s: %s', entry_path, e)
+            return None
+        if sections is None:
+            return None
+
+        logger.info('Loaded cached index for: %s' % path)
+        return sections
+
+    def store(self, path: str, sections: Dict[str, array]):
+        """
+        Save the sections of an index file.
+        """
+        entry_path = self._get_entry_path(path)
+        if entry_path is None:
+            return
+
+        # Write to a temporary file first so readers never see partial entries.
+        temp_path = entry_path.with_suffix('.%d.tmp' % os.getpid())
+        try:
+            temp_path.write_bytes(pack_sections(self.MAGIC, self.FORMAT_VERSION, sections))
+            os.replace(temp_path, entry_path)
+        except OSError as e:
+            logger.warning('Failed to write index cache entry %s: %s', entry_path, e)
+            try:
+                temp_path.unlink()
+            except OSError:
+                pass
+
+    def clear(self):
+        """
+        Remove every entry from the cache.
+        """
+        for entry_path in self.directory.glob('*.idx'):
+            try:
+                entry_path.unlink()
+            except OSError as e:
+                logger.warning('Failed to remove index cache entry %s: %s', entry_path, e)
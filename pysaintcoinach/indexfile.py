@@ -1,19 +1,231 @@
 from abc import ABC, abstractmethod
-from collections.abc import Iterable
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterable, Mapping
 import struct
+import sys
 import zlib
-from typing import Dict, Union, Iterator
+from typing import Dict, List, Union, Iterator, Callable, Optional, Tuple
 
 from .pack import Pack, PackIdentifier
 from .file import FileFactory, File
-from .util import ConcurrentDictionary
+from .indexcache import IndexCache
 
 
 def _compute_hash(s):
     return ~zlib.crc32(s.lower().encode()) & 0xFFFFFFFF
 
 
+# Type code of an unsigned 32-bit array item on this platform.
+_UINT32 = 'I' if array('I').itemsize == 4 else 'L'
+
+
+def hash_paths(paths: Iterable) -> Tuple[array, array, array]:
+    """
+    Compute the directory, file name and full path hashes of many paths.
+
+    Each distinct directory is only hashed once, which makes this much
+    cheaper than hashing the parts of every path separately when the paths
+    share directories.
+    """
+    crc32 = zlib.crc32
+    directory_hashes = {}  # type: Dict[bytes, int]
+    directories = array(_UINT32)
+    names = array(_UINT32)
+    full_paths = array(_UINT32)
+    for path in paths:
+        encoded = path.lower().encode()
+        separator = encoded.rfind(b'/')
+        directory = encoded[:max(separator, 0)]
+        directory_hash = directory_hashes.get(directory, None)
+        if directory_hash is None:
+            directory_hash = directory_hashes[directory] = crc32(directory) ^ 0xFFFFFFFF
+        directories.append(directory_hash)
+        names.append(crc32(encoded[separator + 1:]) ^ 0xFFFFFFFF)
+        full_paths.append(crc32(encoded) ^ 0xFFFFFFFF)
+    return directories, names, full_paths
+
+
+def _read_uint32_array(buffer: bytes) -> array:
+    values = array(_UINT32)
+    values.frombytes(buffer)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+class IndexTable(object):
+    """
+    Column-oriented table of the file entries of an index.
+
+    Entries are kept in parallel arrays (key, directory key, dat file and
+    offset) rather than as one object per entry.
+    """
+
+    @property
+    def keys(self) -> array: return self._keys
+
+    @property
+    def directory_keys(self) -> Optional[array]:
+        """
+        Directory key of every entry, or None for *.index2 tables.
+        """
+        return self._directory_keys
+
+    @property
+    def dat_files(self) -> array: return self._dat_files
+
+    @property
+    def offsets(self) -> array: return self._offsets
+
+    @property
+    def sorted_keys(self) -> array:
+        """
+        Sorted keys of all entries, for membership tests by bisection; for
+        *.index tables, each key is combined with its directory key as
+        `directory_key << 32 | key`.
+        """
+        if self._sorted_keys is None:
+            if self._directory_keys is None:
+                self._sorted_keys = array(_UINT32, sorted(self._keys))
+            else:
+                self._sorted_keys = array('Q', sorted(d << 32 | k for d, k in zip(self._directory_keys, self._keys)))
+        return self._sorted_keys
+
+    def __init__(self, keys, directory_keys, dat_files, offsets):
+        self._keys = keys
+        self._directory_keys = directory_keys
+        self._dat_files = dat_files
+        self._offsets = offsets
+        self._sorted_keys = None  # type: array
+
+    def __len__(self):
+        return len(self._keys)
+
+    def rows_by_location(self, start: int = 0, stop: int = None) -> List[int]:
+        """
+        Get the rows of a range of entries, ordered by where their data is
+        stored in the dat files.
+        """
+        if stop is None:
+            stop = len(self._keys)
+        dat_files = self._dat_files
+        offsets = self._offsets
+        return sorted(range(start, stop), key=lambda r: (dat_files[r], offsets[r]))
+
+    def contains(self, directory_key: Optional[int], key: int) -> bool:
+        """
+        Check whether an entry exists; `directory_key` is ignored for
+        *.index2 tables.
+        """
+        keys = self._sorted_keys
+        if keys is None:
+            keys = self.sorted_keys
+        if self._directory_keys is not None:
+            key = directory_key << 32 | key
+        i = bisect_left(keys, key)
+        return i != len(keys) and keys[i] == key
+
+    def to_sections(self) -> Dict[str, array]:
+        sections = {'keys': self._keys,
+                    'dats': self._dat_files,
+                    'offsets': self._offsets}
+        if self._directory_keys is not None:
+            sections['dirkeys'] = self._directory_keys
+        return sections
+
+    @classmethod
+    def from_sections(cls, sections) -> 'IndexTable':
+        return cls(sections['keys'], sections.get('dirkeys', None), sections['dats'], sections['offsets'])
+
+    @staticmethod
+    def _split_locations(base_offsets):
+        dat_files = array('B', [(b & 0x7) >> 1 for b in base_offsets])
+        offsets = array('Q', [(b & 0xFFFFFFF8) << 3 for b in base_offsets])
+        return dat_files, offsets
+
+    @classmethod
+    def from_index(cls, buffer: bytes) -> 'IndexTable':
+        """
+        Parse the 16-byte file records of a *.index file.
+        """
+        RECORD_WORDS = 4
+
+        values = _read_uint32_array(buffer)
+        dat_files, offsets = cls._split_locations(values[2::RECORD_WORDS])
+        return cls(values[0::RECORD_WORDS], values[1::RECORD_WORDS], dat_files, offsets)
+
+    @classmethod
+    def from_index2(cls, buffer: bytes) -> 'IndexTable':
+        """
+        Parse the 8-byte file records of a *.index2 file.
+        """
+        RECORD_WORDS = 2
+
+        values = _read_uint32_array(buffer)
+        dat_files, offsets = cls._split_locations(values[1::RECORD_WORDS])
+        return cls(values[0::RECORD_WORDS], None, dat_files, offsets)
+
+
+class IndexFileMap(Mapping):
+    """
+    Read-only mapping of file key to index entry for a range of an IndexTable.
+
+    The key lookup table is built on first use, and entry objects are only
+    created when one is requested.
+    """
+
+    @property
+    def table(self) -> IndexTable: return self._table
+
+    def __init__(self,
+                 table: IndexTable,
+                 start: int,
+                 stop: int,
+                 factory: Callable[[IndexTable, int], 'IIndexFile']):
+        self._table = table
+        self._start = start
+        self._stop = stop
+        self._factory = factory
+        self._rows = None  # type: Dict[int, int]
+
+    def _get_rows(self) -> Dict[int, int]:
+        rows = self._rows
+        if rows is None:
+            rows = dict(zip(self._table.keys[self._start:self._stop],
+                            range(self._start, self._stop)))
+            self._rows = rows
+        return rows
+
+    def get_row(self, key: int) -> Optional[int]:
+        """
+        Get the table row of a file key, or None if it isn't present.
+        """
+        return self._get_rows().get(key, None)
+
+    def __getitem__(self, key):
+        return self._factory(self._table, self._get_rows()[key])
+
+    def __contains__(self, key):
+        return key in self._get_rows()
+
+    def __iter__(self):
+        return iter(self._get_rows())
+
+    def __len__(self):
+        return self._stop - self._start
+
+    def keys_by_location(self) -> List[int]:
+        """
+        Get the file keys, ordered by where their data is stored.
+        """
+        keys = self._table.keys
+        return [keys[r] for r in self._table.rows_by_location(self._start, self._stop)]
+
+
 class IIndexFile(ABC):
+    __slots__ = ()
+
     @property
     @abstractmethod
     def pack_id(self): return None
@@ -55,7 +267,11 @@ class Directory(IPackSource):
     @property
     def path(self):
         if self._path is None:
-            return '/'.join([str(self.pack), '{:08X}'.format(self.index.key)])
+            names = self.pack.name_dictionary
+            if names is not None:
+                self._path = names.get_directory_path(self.index.key)
+            if self._path is None:
+                return '/'.join([str(self.pack), '{:08X}'.format(self.index.key)])
         return self._path
 
     @path.setter
@@ -66,7 +282,6 @@ class Directory(IPackSource):
         self._pack = pack
         self._index = index
         self._file_name_map = {}  # type: Dict[str, int]
-        self._files = ConcurrentDictionary()  # type: ConcurrentDictionary[int, File]
         self._path = None
 
     def __repr__(self):
@@ -78,31 +293,41 @@ class Directory(IPackSource):
     def file_exists(self, name_or_key):
         if isinstance(name_or_key, str):
             name_or_key = _compute_hash(name_or_key)
-        return name_or_key in self.index.files
+        return self.index.files.table.contains(self.index.key, name_or_key)
 
     def get_file(self, name_or_key) -> Union[type(None), File]:
         # NOTE: This function /can/ return None!
-        def from_key(key):
-            if key in self._files:
-                return self._files[key]
-
-            index = self.index.files.get(key)
-            if index is None:
-                return None
-            file = FileFactory.get(self.pack, index)
-            self._files[key] = file
-            return file
         if isinstance(name_or_key, str):
-            file = from_key(_compute_hash(name_or_key))
+            file = self._get_file(_compute_hash(name_or_key))
             if file is not None:
                 file.path = "%s/%s" % (self.path, name_or_key)
             return file
         else:
-            return from_key(name_or_key)
+            return self._get_file(name_or_key)
+
+    def _get_file(self, key: int) -> Optional[File]:
+        # Files are shared through the pack's cache.
+        cache_key = (self.index.key, key)
+        file = self.pack.file_cache.get(cache_key)
+        if file is None:
+            if not self.index.files.table.contains(self.index.key, key):
+                return None
+            file = self.pack.file_cache.add(cache_key, FileFactory.get(self.pack, self.index.files[key]))
+        return file
 
     def __iter__(self) -> Iterator[File]:
-        for file_key in self.index.files.values():
-            yield self.get_file(file_key)
+        """
+        Iterate over the files of the directory, skipping those of types
+        that aren't supported.
+
+        Telling those apart takes reading each file's header, so files are
+        created in the order they're stored in the dat files.
+        """
+        for file_key in self.index.files.keys_by_location():
+            try:
+                yield self._get_file(file_key)
+            except TypeError:
+                continue
 
 
 class IndexDirectory(object):
@@ -123,31 +348,14 @@ class IndexDirectory(object):
     def count(self) -> int: return self._count
 
     @property
-    def files(self) -> Dict[int, 'IndexFile']: return self._files
+    def files(self) -> IndexFileMap: return self._files
 
-    def __init__(self, pack_id, stream):
-        self._files = {}  # type: Dict[int, 'IndexFile']
+    def __init__(self, pack_id, key: int, offset: int, count: int, files: IndexFileMap):
         self._pack_id = pack_id
-
-        self._read_meta(stream)
-        pos = stream.tell()
-        self._read_files(stream)
-        stream.seek(pos)
-
-    def _read_meta(self, stream):
-        self._key, self._offset, _len = struct.unpack('<Lll4x', stream.read(16))
-        self._count = int(_len / 0x10)
-
-    def _read_files(self, stream):
-        stream.seek(self.offset)
-
-        rem = self.count
-        files = []
-        while rem > 0:
-            rem -= 1
-            files += [IndexFile(self.pack_id, stream)]
-
-        self._files = dict([(file.file_key, file) for file in files])
+        self._key = key
+        self._offset = offset
+        self._count = count
+        self._files = files
 
     def __repr__(self):
         return "IndexDir(dir_key=%08X)" % self.key
@@ -199,13 +407,11 @@ class IndexSource(IPackSource):
             raise ValueError('path')
 
         last_separator = path.rindex('/')
-        dir_path = path[:last_separator]
-        base_name = path[last_separator + 1:]
-
-        if self.directory_exists(dir_path):
-            _dir = self.get_directory(dir_path)
-            return _dir.file_exists(base_name)
-        return False
+        directory_key = _compute_hash(path[:last_separator])
+        # Most misses are for directories that don't exist at all.
+        if directory_key not in self.index.directories:
+            return False
+        return self.index.table.contains(directory_key, _compute_hash(path[last_separator + 1:]))
 
     def get_file(self, path: str) -> File:
         if '/' not in path:
@@ -214,10 +420,15 @@ class IndexSource(IPackSource):
         last_separator = path.rindex('/')
         dir_path = path[:last_separator]
         base_name = path[last_separator + 1:]
-        _dir = self.get_directory(dir_path)
-        if _dir is not None:
-            return _dir.get_file(base_name)
-        return None
+        directory_key = _compute_hash(dir_path)
+        file_key = _compute_hash(base_name)
+        if not self.index.table.contains(directory_key, file_key):
+            return None
+        _dir = self.get_directory(directory_key)
+        _dir.path = dir_path
+        file = _dir.get_file(file_key)
+        file.path = path
+        return file
 
     def get_file_from_keys(self, directory_key: int, file_key: int) -> File:
         _dir = self.get_directory(directory_key)
@@ -225,13 +436,38 @@ class IndexSource(IPackSource):
             return _dir.get_file(file_key)
         return None
 
+    def find_entry(self, path: str):
+        """
+        Get the (directory key, file key, index entry) of a path.
+
+        The entry is None if the file doesn't exist.
+        """
+        last_separator = path.rfind('/')
+        return self._find_entry(_compute_hash(path[:max(last_separator, 0)]),
+                                _compute_hash(path[last_separator + 1:]))
+
+    def find_entries(self, paths: Iterable) -> list:
+        """
+        Get the (directory key, file key, index entry) of many paths at once.
+        """
+        directory_hashes, name_hashes, _ = hash_paths(paths)
+        return [self._find_entry(d, n) for d, n in zip(directory_hashes, name_hashes)]
+
+    def _find_entry(self, directory_key: int, file_key: int):
+        if not self.index.table.contains(directory_key, file_key):
+            return directory_key, file_key, None
+        return directory_key, file_key, self.index.directories[directory_key].files[file_key]
+
     def __iter__(self):
-        from itertools import chain
-        for index in chain.from_iterable(map(lambda x: x.files.values(),
-                                             self.index.directories.values())):
+        """
+        Iterate over the files of the pack, skipping those of types that
+        aren't supported, in the order they're stored in the dat files.
+        """
+        table = self.index.table
+        for row in table.rows_by_location():
+            _dir = self.get_directory(table.directory_keys[row])
             try:
-                _file = self.get_file_from_keys(index.directory_key, index.file_key)
-                yield _file
+                yield _dir._get_file(table.keys[row])
             except TypeError:
                 continue
 
@@ -250,11 +486,21 @@ class Index(object):
     @property
     def directories(self) -> Dict[int, IndexDirectory]: return self._directories
 
-    def __init__(self, pack_id, path_or_stream):
+    @property
+    def table(self) -> IndexTable: return self._table
+
+    def __init__(self, pack_id, path_or_stream, cache: 'IndexCache' = None):
         self._pack_id = pack_id
         if isinstance(path_or_stream, str):
+            sections = cache.load(path_or_stream) if cache is not None else None
+            if sections is not None:
+                self._load_sections(sections)
+                return
+
             with open(path_or_stream, 'rb') as stream:
                 self._build(stream)
+            if cache is not None:
+                cache.store(path_or_stream, self._get_sections())
         else:
             self._build(path_or_stream)
 
@@ -264,6 +510,7 @@ class Index(object):
         assert file_magic == SQPACKMAGIC
 
         self._read_header(stream)
+        self._read_files(stream)
         self._read_directories(stream)
 
     def _read_header(self, stream):
@@ -275,13 +522,49 @@ class Index(object):
         stream.seek(header_offset)
         self._header = IndexHeader(stream)
 
-    def _read_directories(self, stream):
-        stream.seek(self.header.directories_offset)
+    def _read_files(self, stream):
+        RECORD_LENGTH = 0x10
 
-        dirs = [IndexDirectory(self.pack_id, stream)
-                for _ in range(self.header.directories_count)]
+        stream.seek(self.header.files_offset)
+        self._table = IndexTable.from_index(stream.read(self.header.files_count * RECORD_LENGTH))
 
-        self._directories = dict([(_dir.key, _dir) for _dir in dirs])
+    def _read_directories(self, stream):
+        RECORD_LENGTH = 0x10
+
+        stream.seek(self.header.directories_offset)
+        self._build_directories(_read_uint32_array(stream.read(self.header.directories_count * RECORD_LENGTH)))
+
+    def _build_directories(self, values):
+        RECORD_LENGTH = 0x10
+        RECORD_WORDS = 4
+
+        self._directories = {}
+        for i in range(0, len(values), RECORD_WORDS):
+            key, offset, length = values[i:i + 3]
+            start = (offset - self.header.files_offset) // RECORD_LENGTH
+            count = length // RECORD_LENGTH
+            files = IndexFileMap(self._table, start, start + count, self._create_file)
+            self._directories[key] = IndexDirectory(self.pack_id, key, offset, count, files)
+
+    def _create_file(self, table: IndexTable, row: int) -> 'IndexFile':
+        return IndexFile.from_table(self.pack_id, table, row)
+
+    def _get_sections(self) -> Dict[str, array]:
+        sections = self._table.to_sections()
+        sections['header'] = array('Q', [self.header.files_offset,
+                                         self.header.files_count,
+                                         self.header.directories_offset,
+                                         self.header.directories_count])
+        directories = array(_UINT32)
+        for directory in self._directories.values():
+            directories.extend([directory.key, directory.offset, directory.count * 0x10, 0])
+        sections['dirs'] = directories
+        return sections
+
+    def _load_sections(self, sections):
+        self._header = IndexHeader.from_values(*sections['header'])
+        self._table = IndexTable.from_sections(sections)
+        self._build_directories(sections['dirs'])
 
 
 class IndexHeader(object):
@@ -311,8 +594,19 @@ class IndexHeader(object):
         self._directories_offset, dir_length = struct.unpack('<ll', stream.read(8))
         self._directories_count = int(dir_length / 0x10)
 
+    @classmethod
+    def from_values(cls, files_offset, files_count, directories_offset, directories_count) -> 'IndexHeader':
+        header = cls.__new__(cls)
+        header._files_offset = files_offset
+        header._files_count = files_count
+        header._directories_offset = directories_offset
+        header._directories_count = directories_count
+        return header
+
 
 class IndexFile(IIndexFile):
+    __slots__ = ('_pack_id', '_file_key', '_directory_key', '_dat_file', '_offset')
+
     @property
     def pack_id(self): return self._pack_id
 
@@ -336,6 +630,16 @@ class IndexFile(IIndexFile):
         self._dat_file = (base_offset & 0x7) >> 1
         self._offset = (base_offset & 0xFFFFFFF8) << 3
 
+    @classmethod
+    def from_table(cls, pack_id, table: IndexTable, row: int) -> 'IndexFile':
+        file = cls.__new__(cls)
+        file._pack_id = pack_id
+        file._file_key = table.keys[row]
+        file._directory_key = table.directory_keys[row]
+        file._dat_file = table.dat_files[row]
+        file._offset = table.offsets[row]
+        return file
+
     def __hash__(self):
         return ((self.dat_file << 24) | hash(self._pack_id)) ^ self.offset
 
@@ -363,33 +667,61 @@ class Index2Source(IPackSource):
     def __init__(self, pack, index):
         self._pack = pack
         self._index = index
-        self._files = {}
         self._file_path_map = {}
 
     def file_exists(self, path_or_hash):
         if isinstance(path_or_hash, str):
             path_or_hash = _compute_hash(path_or_hash)
-        return path_or_hash in self.index.files
+        return self.index.table.contains(None, path_or_hash)
 
     def get_file(self, path_or_hash):
-        def from_hash(hash):
-            file = self._files.get(hash, None)
-            if file is not None:
-                return file
-
-            index = self.index.files[hash]
-            file = FileFactory.get(self.pack, index)
-            self._files[hash] = file
-            return file
         if isinstance(path_or_hash, str):
-            f = from_hash(_compute_hash(path_or_hash))
+            f = self._get_file(_compute_hash(path_or_hash))
             f.path = path_or_hash
             return f
-        return from_hash(path_or_hash)
+        return self._get_file(path_or_hash)
+
+    def get_file_from_keys(self, directory_key: Optional[int], file_key: int) -> File:
+        return self.get_file(file_key)
+
+    def find_entry(self, path: str):
+        """
+        Get the (directory key, file key, index entry) of a path.
+
+        Index2 files are only keyed by the full path hash, so the directory
+        key is always None. The entry is None if the file doesn't exist.
+        """
+        key = _compute_hash(path)
+        if not self.index.table.contains(None, key):
+            return None, key, None
+        return None, key, self.index.files[key]
+
+    def find_entries(self, paths: Iterable) -> list:
+        """
+        Get the (directory key, file key, index entry) of many paths at once.
+        """
+        _, _, path_hashes = hash_paths(paths)
+        files = self.index.files
+        table = self.index.table
+        return [(None, key, files[key] if table.contains(None, key) else None) for key in path_hashes]
+
+    def _get_file(self, hash: int) -> File:
+        cache_key = (None, hash)
+        file = self.pack.file_cache.get(cache_key)
+        if file is None:
+            file = self.pack.file_cache.add(cache_key, FileFactory.get(self.pack, self.index.files[hash]))
+        return file
 
     def __iter__(self):
-        for file in self.index.files.values():
-            yield self.get_file(file.file_key)
+        """
+        Iterate over the files of the pack, skipping those of types that
+        aren't supported, in the order they're stored in the dat files.
+        """
+        for file_key in self.index.files.keys_by_location():
+            try:
+                yield self._get_file(file_key)
+            except TypeError:
+                continue
 
 
 class Index2(object):
@@ -405,11 +737,21 @@ class Index2(object):
     @property
     def pack_id(self): return self._pack_id
 
-    def __init__(self, pack_id, path_or_stream):
+    @property
+    def table(self) -> IndexTable: return self._table
+
+    def __init__(self, pack_id, path_or_stream, cache: 'IndexCache' = None):
         self._pack_id = pack_id
         if isinstance(path_or_stream, str):
+            sections = cache.load(path_or_stream) if cache is not None else None
+            if sections is not None:
+                self._load_sections(sections)
+                return
+
             with open(path_or_stream, 'rb') as stream:
                 self._build(stream)
+            if cache is not None:
+                cache.store(path_or_stream, self._get_sections())
         else:
             self._build(path_or_stream)
 
@@ -431,17 +773,24 @@ class Index2(object):
         self._header = Index2Header(stream)
 
     def _read_files(self, stream):
+        RECORD_LENGTH = 0x08
+
         stream.seek(self.header.files_offset)
+        self._table = IndexTable.from_index2(stream.read(self.header.files_count * RECORD_LENGTH))
+        self._files = IndexFileMap(self._table, 0, len(self._table), self._create_file)
+
+    def _create_file(self, table: IndexTable, row: int) -> 'Index2File':
+        return Index2File.from_table(self.pack_id, table, row)
 
-        files = [Index2File(self.pack_id, stream)
-                 for _ in range(self.header.files_count)]
-        # rem = self.header.files_count
-        # files = []
-        # while rem > 0:
-        #     rem -= 1
-        #     files += [Index2File(self.pack_id, stream)]
+    def _get_sections(self) -> Dict[str, array]:
+        sections = self._table.to_sections()
+        sections['header'] = array('Q', [self.header.files_offset, self.header.files_count])
+        return sections
 
-        self._files = dict([(file.file_key, file) for file in files])
+    def _load_sections(self, sections):
+        self._header = Index2Header.from_values(*sections['header'])
+        self._table = IndexTable.from_sections(sections)
+        self._files = IndexFileMap(self._table, 0, len(self._table), self._create_file)
 
 
 class Index2Header(object):
@@ -460,8 +809,17 @@ class Index2Header(object):
         self._files_offset, files_length = struct.unpack('<ll', stream.read(8))
         self._files_count = int(files_length / 0x08)
 
+    @classmethod
+    def from_values(cls, files_offset, files_count) -> 'Index2Header':
+        header = cls.__new__(cls)
+        header._files_offset = files_offset
+        header._files_count = files_count
+        return header
+
 
 class Index2File(IIndexFile):
+    __slots__ = ('_pack_id', '_file_key', '_dat_file', '_offset')
+
     @property
     def pack_id(self): return self._pack_id
 
@@ -482,6 +840,15 @@ class Index2File(IIndexFile):
         self._dat_file = (base_offset & 0x7) >> 1
         self._offset = (base_offset & 0xFFFFFFF8) << 3
 
+    @classmethod
+    def from_table(cls, pack_id, table: IndexTable, row: int) -> 'Index2File':
+        file = cls.__new__(cls)
+        file._pack_id = pack_id
+        file._file_key = table.keys[row]
+        file._dat_file = table.dat_files[row]
+        file._offset = table.offsets[row]
+        return file
+
     def __hash__(self):
         return ((self.dat_file << 24) | hash(self._pack_id)) ^ self.offset
 
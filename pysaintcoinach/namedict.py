@@ -0,0 +1,127 @@
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+import logging
+import mmap
+
+from .indexcache import pack_sections, unpack_sections
+from .indexfile import hash_paths, _UINT32
+
+
+logger = logging.getLogger(__name__)
+
+
+class NameDictionary(object):
+    """
+    Maps index hashes back to the paths they were computed from.
+
+    Built once from a list of known paths, it holds sorted hash arrays and
+    a string table that are searched with bisect, so it can be saved and
+    memory-mapped back in instead of hashing the paths again.
+    """
+
+    MAGIC = b'SCNAMDIC'
+    FORMAT_VERSION = 1
+
+    def __init__(self, sections: Dict[str, array]):
+        # Sorted keys, each followed by the index of its string:
+        #  files: directory hash << 32 | file name hash (*.index)
+        #  dirs: directory hash (*.index)
+        #  paths: full path hash (*.index2)
+        self._file_keys = sections['fkeys']
+        self._file_names = sections['fnames']
+        self._directory_keys = sections['dkeys']
+        self._directory_names = sections['dnames']
+        self._path_keys = sections['pkeys']
+        self._path_names = sections['pnames']
+        # Start of every string in the table, followed by its end.
+        self._string_offsets = sections['strofs']
+        self._strings = sections['strings']
+        self._sections = sections
+
+    def __len__(self):
+        return len(self._string_offsets) - 1
+
+    @classmethod
+    def build(cls, paths: Iterable[str]) -> 'NameDictionary':
+        """
+        Build a dictionary from paths, one per item; surrounding whitespace
+        and empty items are ignored.
+        """
+        strings = bytearray()
+        string_offsets = array('Q')
+        string_ids = {}  # type: Dict[str, int]
+
+        def add_string(s):
+            i = string_ids.get(s, None)
+            if i is None:
+                i = string_ids[s] = len(string_offsets)
+                string_offsets.append(len(strings))
+                strings.extend(s.encode())
+            return i
+
+        paths = [p for p in (p.strip() for p in paths) if len(p) > 0]
+        directory_hashes, name_hashes, path_hashes = hash_paths(paths)
+        files = {}  # type: Dict[int, int]
+        directories = {}  # type: Dict[int, int]
+        full_paths = {}  # type: Dict[int, int]
+        for i, path in enumerate(paths):
+            path_id = add_string(path)
+            files.setdefault(directory_hashes[i] << 32 | name_hashes[i], path_id)
+            full_paths.setdefault(path_hashes[i], path_id)
+            if directory_hashes[i] not in directories:
+                directories[directory_hashes[i]] = add_string(path[:max(path.rfind('/'), 0)])
+        string_offsets.append(len(strings))
+
+        sections = {'strofs': string_offsets, 'strings': array('B', strings)}
+        for name, mapping, type_code in (('f', files, 'Q'), ('d', directories, _UINT32), ('p', full_paths, _UINT32)):
+            keys = sorted(mapping)
+            sections[name + 'keys'] = array(type_code, keys)
+            sections[name + 'names'] = array(_UINT32, [mapping[k] for k in keys])
+        logger.info('Built name dictionary of %u paths' % len(paths))
+        return cls(sections)
+
+    def save(self, path: Union[str, Path]):
+        Path(path).write_bytes(pack_sections(self.MAGIC, self.FORMAT_VERSION, self._sections))
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'NameDictionary':
+        with open(path, 'rb') as f:
+            view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        sections = unpack_sections(view, cls.MAGIC, cls.FORMAT_VERSION)
+        if sections is None:
+            raise ValueError('Not a name dictionary written by this version: %s' % path)
+        return cls(sections)
+
+    def get_file_path(self, directory_key: Optional[int], file_key: int) -> Optional[str]:
+        """
+        Get the path of a file, or None if it's unknown.
+
+        For *.index2 entries, which are keyed by the hash of the full path,
+        `directory_key` is None.
+        """
+        if directory_key is None:
+            return self.__find(self._path_keys, self._path_names, file_key)
+        return self.__find(self._file_keys, self._file_names, directory_key << 32 | file_key)
+
+    def get_directory_path(self, directory_key: int) -> Optional[str]:
+        return self.__find(self._directory_keys, self._directory_names, directory_key)
+
+    def get_file_paths(self, prefix: str = '') -> List[str]:
+        """
+        Get the known file paths starting with `prefix`, sorted.
+        """
+        string_ids = set(self._file_names)
+        string_ids.update(self._path_names)
+        paths = (self.__get_string(i) for i in string_ids)
+        return sorted(p for p in paths if p.startswith(prefix))
+
+    def __find(self, keys, names, key) -> Optional[str]:
+        i = bisect_left(keys, key)
+        if i == len(keys) or keys[i] != key:
+            return None
+        return self.__get_string(names[i])
+
+    def __get_string(self, string_id: int) -> str:
+        return bytes(self._strings[self._string_offsets[string_id]:self._string_offsets[string_id + 1]]).decode()
@@ -1,13 +1,24 @@
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
 from collections.abc import Iterable
+from contextlib import contextmanager
 from pathlib import Path
 from weakref import WeakValueDictionary
 import io
 import logging
-from typing import Iterable as IterableT, Dict, Tuple, IO
+import mmap
+import os
+import time
+from typing import Iterable as IterableT, Iterator, Dict, List, Optional, Tuple, IO
 from threading import Lock
-import threading
 
-from .util import ConcurrentDictionary
+from . import aio
+from .datacache import DataCache, SpillCache
+from .file import FileCache
+from .indexcache import IndexCache
+from .storage import StorageBackend
+from .util import ConcurrentCache
 
 
 logger = logging.getLogger(__name__)
@@ -113,33 +124,550 @@ class PackIdentifier(object):
         return PackIdentifier(type, expansion, number)
 
 
-class PackCollection(object):
+class DataHandlePool(object):
+    """
+    Bounded pool of read-only file descriptors for the dat files of a pack.
+
+    Reads are positional (`os.pread`), so a single descriptor is shared by
+    every thread and no per-thread stream state is kept. Where `os.pread` is
+    not available (Windows), reads on a descriptor are serialised instead.
+
+    Descriptors are opened with a hint for random access, which suits point
+    lookups, and switched to sequential access while a scan is in progress.
+    Hints are skipped where `os.posix_fadvise` is not available.
+    """
+
+    DEFAULT_MAX_HANDLES = 8
+    DEFAULT_IDLE_TIMEOUT = 60.0
+
+    class _Handle(object):
+        def __init__(self, fd):
+            self.fd = fd
+            self.lock = Lock()
+            self.users = 0
+            self.last_used = time.monotonic()
+
+    @property
+    def max_handles(self) -> int: return self._max_handles
+
+    @max_handles.setter
+    def max_handles(self, value):
+        if value < 1:
+            raise ValueError('max_handles')
+        self._max_handles = value
+        with self._lock:
+            self._trim()
+
+    @property
+    def idle_timeout(self) -> float: return self._idle_timeout
+
+    @idle_timeout.setter
+    def idle_timeout(self, value): self._idle_timeout = value
+
+    @property
+    def open_count(self) -> int: return len(self._handles)
+
+    @property
+    def scanning(self) -> bool: return self._scans > 0
+
+    def __init__(self, max_handles: int = DEFAULT_MAX_HANDLES, idle_timeout: float = DEFAULT_IDLE_TIMEOUT):
+        if max_handles < 1:
+            raise ValueError('max_handles')
+        self._max_handles = max_handles
+        self._idle_timeout = idle_timeout
+        self._handles = OrderedDict()  # type: OrderedDict[str, DataHandlePool._Handle]
+        self._lock = Lock()
+        self._scans = 0
+
+    def begin_scan(self):
+        """
+        Hint that the dat files will be read mostly in increasing offset
+        order, until a matching call to `end_scan`.
+        """
+        with self._lock:
+            self._scans += 1
+            if self._scans == 1:
+                for handle in self._handles.values():
+                    self._advise(handle.fd, 0, 0, 'SEQUENTIAL')
+
+    def end_scan(self):
+        with self._lock:
+            self._scans -= 1
+            if self._scans == 0:
+                for handle in self._handles.values():
+                    self._advise(handle.fd, 0, 0, 'RANDOM')
+
+    def will_need(self, path: str, offset: int, length: int):
+        """
+        Hint that a range of a file will be read soon, so the OS can start
+        reading it in the background.
+        """
+        if not hasattr(os, 'posix_fadvise'):
+            return
+        handle = self._acquire(path)
+        try:
+            self._advise(handle.fd, offset, length, 'WILLNEED')
+        finally:
+            self._release(handle)
+
+    @staticmethod
+    def _advise(fd: int, offset: int, length: int, advice: str):
+        if not hasattr(os, 'posix_fadvise'):
+            return
+        try:
+            os.posix_fadvise(fd, offset, length, getattr(os, 'POSIX_FADV_' + advice))
+        except OSError:
+            # Only a hint; some file systems don't take it.
+            pass
+
+    def read(self, path: str, offset: int, length: int) -> bytes:
+        handle = self._acquire(path)
+        try:
+            if hasattr(os, 'pread'):
+                data = os.pread(handle.fd, length, offset)
+                # Regular files only come up short at EOF, but don't rely on it.
+                while 0 < len(data) < length:
+                    more = os.pread(handle.fd, length - len(data), offset + len(data))
+                    if len(more) == 0:
+                        break
+                    data += more
+            else:
+                with handle.lock:
+                    os.lseek(handle.fd, offset, os.SEEK_SET)
+                    data = os.read(handle.fd, length)
+                    while 0 < len(data) < length:
+                        more = os.read(handle.fd, length - len(data))
+                        if len(more) == 0:
+                            break
+                        data += more
+            return data
+        finally:
+            self._release(handle)
+
+    def close_idle(self):
+        """
+        Close every handle that has been idle for longer than `idle_timeout`.
+        """
+        with self._lock:
+            self._trim()
+
+    def close(self):
+        """
+        Close every handle not currently in use.
+        """
+        with self._lock:
+            for path, handle in list(self._handles.items()):
+                if handle.users == 0:
+                    self._close(path)
+
+    def _acquire(self, path: str) -> 'DataHandlePool._Handle':
+        with self._lock:
+            handle = self._handles.get(path, None)
+            if handle is None:
+                logger.info('Opening: %s' % path)
+                handle = DataHandlePool._Handle(os.open(path, os.O_RDONLY | getattr(os, 'O_BINARY', 0)))
+                self._advise(handle.fd, 0, 0, 'SEQUENTIAL' if self._scans > 0 else 'RANDOM')
+                self._handles[path] = handle
+            else:
+                self._handles.move_to_end(path)
+            handle.users += 1
+            return handle
+
+    def _release(self, handle: 'DataHandlePool._Handle'):
+        with self._lock:
+            handle.users -= 1
+            handle.last_used = time.monotonic()
+            self._trim()
+
+    def _trim(self):
+        # Must be called with the lock held. Handles in use are never closed,
+        # so the pool can briefly exceed its cap under heavy concurrency.
+        now = time.monotonic()
+        excess = len(self._handles) - self._max_handles
+        for path, handle in list(self._handles.items()):
+            if handle.users > 0:
+                continue
+            if excess > 0 or now - handle.last_used > self._idle_timeout:
+                self._close(path)
+                excess -= 1
+
+    def _close(self, path: str):
+        handle = self._handles.pop(path)
+        logger.info('Closing: %s' % path)
+        os.close(handle.fd)
+
+
+class PackCollection(StorageBackend):
+    """
+    Game files stored in the SqPack files of a data directory.
+
+    Files held by any of the `overlays` take precedence over the packs. The
+    data directory may be None, in which case only the overlays are used.
+    """
+
+    _VERSION_FILE = "ffxivgame.ver"
+
+    DEFAULT_PATH_CACHE_SIZE = 0x10000
+
+    # Marks paths whose pack doesn't exist in the path cache.
+    _NO_PACK = (None, None, None, None)
+
+    # Largest gap between two files that read_many still covers with one read.
+    READ_MANY_MAX_GAP = 0x10000
+    # Largest single read done by read_many, unless one file is bigger.
+    READ_MANY_MAX_SPAN = 0x1000000
+
     @property
     def data_directory(self): return self._data_directory
 
     @property
     def packs(self) -> 'IterableT[Pack]': return self._packs.values()
 
-    def __init__(self, data_directory):
+    @property
+    def overlays(self) -> 'List[StorageBackend]':
+        """
+        Backends consulted, in order, before the packs.
+        """
+        return self._overlays
+
+    @property
+    def game_version(self) -> str:
+        """
+        Version of the game the data directory belongs to, or an empty string
+        if it can't be determined.
+        """
+        if self._game_version is None:
+            self._game_version = self.__read_game_version()
+        return self._game_version
+
+    @property
+    def use_mmap(self):
+        """
+        Whether packs created by this collection memory-map their dat files.
+        """
+        return self._use_mmap
+
+    @use_mmap.setter
+    def use_mmap(self, value):
+        self._use_mmap = value
+        for pack in self.packs:
+            pack.use_mmap = value
+
+    @property
+    def parallel_inflate_threshold(self) -> int:
+        """
+        Minimum size of a file for its blocks to be inflated in parallel,
+        or None to always inflate them one after another.
+        """
+        return self._parallel_inflate_threshold
+
+    @parallel_inflate_threshold.setter
+    def parallel_inflate_threshold(self, value):
+        self._parallel_inflate_threshold = value
+        for pack in self.packs:
+            pack.parallel_inflate_threshold = value
+
+    @property
+    def max_open_handles(self) -> int:
+        """
+        Maximum number of dat file handles each pack keeps open.
+        """
+        return self._max_open_handles
+
+    @property
+    def handle_idle_timeout(self) -> float:
+        """
+        Number of seconds after which an unused dat file handle is closed.
+        """
+        return self._handle_idle_timeout
+
+    @property
+    def data_cache(self) -> DataCache:
+        """
+        Cache of decompressed file data shared by all packs.
+        """
+        return self._data_cache
+
+    @property
+    def spill_cache(self) -> SpillCache:
+        """
+        On-disk cache of decompressed file data behind the data cache, or
+        None if not enabled.
+        """
+        return self._spill_cache
+
+    @property
+    def name_dictionary(self) -> 'NameDictionary':
+        """
+        Dictionary used to name files and directories reached by iterating
+        packs, or None.
+        """
+        return self._name_dictionary
+
+    @name_dictionary.setter
+    def name_dictionary(self, value): self._name_dictionary = value
+
+    @property
+    def index_cache(self) -> IndexCache:
+        """
+        On-disk cache of parsed index files, or None if not enabled.
+        """
+        return self._index_cache
+
+    def __init__(self,
+                 data_directory,
+                 use_mmap: bool = False,
+                 max_open_handles: int = DataHandlePool.DEFAULT_MAX_HANDLES,
+                 handle_idle_timeout: float = DataHandlePool.DEFAULT_IDLE_TIMEOUT,
+                 index_cache_dir=None,
+                 parallel_inflate_threshold: int = None,
+                 data_cache_size: int = DataCache.DEFAULT_MAX_BYTES,
+                 path_cache_size: int = DEFAULT_PATH_CACHE_SIZE,
+                 name_dictionary: 'NameDictionary' = None,
+                 overlays: 'IterableT[StorageBackend]' = None,
+                 spill_cache_dir=None,
+                 spill_cache_size: int = SpillCache.DEFAULT_MAX_BYTES):
         if isinstance(data_directory, str):
             data_directory = Path(data_directory)
         if isinstance(data_directory, Path):
             if not (data_directory.exists() and data_directory.is_dir()):
                 raise FileNotFoundError
-        else:
+        elif data_directory is not None:
             raise TypeError("data_directory")
         self._data_directory = data_directory
-        self._packs = ConcurrentDictionary()  # type: ConcurrentDictionary[PackIdentifier, Pack]
+        self._overlays = list(overlays) if overlays is not None else []
+        self._use_mmap = use_mmap
+        self._parallel_inflate_threshold = parallel_inflate_threshold
+        self._max_open_handles = max_open_handles
+        self._handle_idle_timeout = handle_idle_timeout
+        self._data_cache = DataCache(data_cache_size)
+        self._name_dictionary = name_dictionary
+        self._game_version = None
+        self._index_cache = None
+        if index_cache_dir is not None:
+            self._index_cache = IndexCache(index_cache_dir, self.game_version)
+        self._spill_cache = None
+        if spill_cache_dir is not None:
+            self._spill_cache = SpillCache(spill_cache_dir, self.game_version, spill_cache_size)
+        self._packs = ConcurrentCache()  # type: ConcurrentCache[PackIdentifier, Pack]
+        self._path_cache_size = path_cache_size
+        self._path_cache = OrderedDict()  # type: OrderedDict[str, Tuple]
+        self._path_cache_lock = Lock()
+
+    def __read_game_version(self) -> str:
+        # The version file sits next to the sqpack directory.
+        if self.data_directory is None:
+            return ''
+        version_path = self.data_directory.parent.joinpath(self._VERSION_FILE)
+        if version_path.exists():
+            return version_path.read_text().strip()
+        return ''
 
     def file_exists(self, path: str):
-        pack = self.get_pack(path)
-        return pack is not None and pack.file_exists(path)
+        for overlay in self._overlays:
+            if overlay.file_exists(path):
+                return True
+        pack, directory_key, file_key, entry = self.resolve_path(path)
+        return entry is not None
 
     def get_file(self, path: str):
+        for overlay in self._overlays:
+            file = overlay.get_file(path)
+            if file is not None:
+                return file
+        resolved = self.resolve_path(path)
+        pack, directory_key, file_key, entry = resolved
+        if pack is None:
+            return None
+        if entry is None:
+            # Import here to prevent mutual dependency.
+            from .indexfile import Index2Source
+
+            # Answered from the cached resolution, the way the pack's source
+            # would: index2 sources raise KeyError for missing paths.
+            if isinstance(pack.source, Index2Source):
+                raise KeyError(file_key)
+            return None
+        return self.__get_resolved_file(path, resolved)
+
+    async def aget_file(self, path: str):
+        """
+        Coroutine version of `get_file`, run on the shared executor.
+        """
+        return await aio.run((self, 'file', path), self.get_file, path)
+
+    def get_files(self, paths: IterableT[str]) -> 'List[Optional[File]]':
+        """
+        Get many files at once, in the order of `paths`.
+
+        The files are looked up in the order they are stored in the dat files
+        rather than in the given order. Files that don't exist are None.
+        """
+        paths = list(paths)
+        files = [None] * len(paths)
+        overlay_files = self.__get_overlay_files(paths)
+        for i, file in overlay_files.items():
+            files[i] = file
+        groups, missing = self.__group_by_location(paths, overlay_files)
+        for (pack, dat_file), requests in groups.items():
+            for offset, i, resolved in requests:
+                files[i] = self.__get_resolved_file(paths[i], resolved)
+        return files
+
+    def read_many(self, paths: IterableT[str]) -> 'Iterator[Tuple[str, bytes]]':
+        """
+        Read the data of many files, yielding (path, data) pairs.
+
+        Files are read in the order they are stored in each dat file, and
+        files close to each other are fetched with a single large read.
+        Files of the overlays are yielded first, followed by the paths that
+        don't exist, with None as their data.
+        """
+        paths = list(paths)
+        overlay_files = self.__get_overlay_files(paths)
+        for i, file in overlay_files.items():
+            yield paths[i], file.get_data()
+        groups, missing = self.__group_by_location(paths, overlay_files)
+        for i in missing:
+            yield paths[i], None
+
+        for (pack, dat_file), requests in groups.items():
+            runs = list(self.__merge_reads(pack, dat_file, requests))
+            for i, (start, end, run) in enumerate(runs):
+                if i + 1 < len(runs):
+                    # Let the OS fetch the next run while this one is inflated.
+                    pack.will_need(dat_file, runs[i + 1][0], runs[i + 1][1] - runs[i + 1][0])
+                if pack.use_mmap or pack.keep_in_memory:
+                    # Already served from memory, so reading ahead gains nothing.
+                    for offset, position, resolved in run:
+                        yield paths[position], self.__get_resolved_file(paths[position], resolved).get_data()
+                    continue
+
+                with pack.prefetch(dat_file, start, pack.read_data(dat_file, start, end - start)):
+                    for offset, position, resolved in run:
+                        yield paths[position], self.__get_resolved_file(paths[position], resolved).get_data()
+
+    def will_need(self, paths: IterableT[str]):
+        """
+        Hint that the files at the given paths will be read soon, so the OS
+        can start reading them in the background.
+        """
+        groups, missing = self.__group_by_location(list(paths), None)
+        for (pack, dat_file), requests in groups.items():
+            for start, end, run in self.__merge_reads(pack, dat_file, requests):
+                pack.will_need(dat_file, start, end - start)
+
+    def __get_resolved_file(self, path, resolved):
+        pack, directory_key, file_key, entry = resolved
+        file = pack.get_file_from_keys(directory_key, file_key)
+        if file is not None:
+            file.path = path
+        return file
+
+    def __get_overlay_files(self, paths: 'List[str]') -> 'Dict[int, File]':
+        # Maps the positions of the paths found in an overlay to their files.
+        files = OrderedDict()  # type: OrderedDict[int, File]
+        if self._overlays:
+            for i, path in enumerate(paths):
+                for overlay in self._overlays:
+                    file = overlay.get_file(path)
+                    if file is not None:
+                        files[i] = file
+                        break
+        return files
+
+    def __group_by_location(self, paths: 'List[str]', skip) -> 'Tuple[Dict[Tuple[Pack, int], List[Tuple]], List[int]]':
+        # Maps each (pack, dat file) to its existing files sorted by offset,
+        # and lists the positions of the paths that don't exist. Positions
+        # in `skip` are left out.
+        groups = OrderedDict()  # type: OrderedDict[Tuple[Pack, int], List[Tuple]]
+        missing = []
+        if skip:
+            positions = [i for i in range(len(paths)) if i not in skip]
+        else:
+            positions = range(len(paths))
+        for i, resolved in zip(positions, self.resolve_paths([paths[i] for i in positions])):
+            pack, directory_key, file_key, entry = resolved
+            if entry is None:
+                missing.append(i)
+            else:
+                groups.setdefault((pack, entry.dat_file), []).append((entry.offset, i, resolved))
+        for requests in groups.values():
+            requests.sort(key=lambda r: r[0])
+        return groups, missing
+
+    def __merge_reads(self, pack: 'Pack', dat_file: int, requests: 'List[Tuple]'):
+        # Splits sorted requests into runs of (start, end, requests) that can
+        # each be fetched with one read.
+        run = []
+        start = end = 0
+        for request in requests:
+            offset = request[0]
+            request_end = pack.get_entry_end(dat_file, offset)
+            if run and (offset - end > self.READ_MANY_MAX_GAP or
+                        request_end - start > self.READ_MANY_MAX_SPAN):
+                yield start, end, run
+                run = []
+            if not run:
+                start = offset
+            run.append(request)
+            end = max(end, request_end) if len(run) > 1 else request_end
+        if run:
+            yield start, end, run
+
+    def resolve_path(self, path: str) -> Tuple:
+        """
+        Get the (pack, directory key, file key, index entry) a path refers to.
+
+        Results, including paths that don't exist, are kept in a bounded
+        cache so repeated lookups skip parsing and hashing the path.
+        """
+        with self._path_cache_lock:
+            resolved = self._path_cache.get(path, None)
+            if resolved is not None:
+                self._path_cache.move_to_end(path)
+                return resolved
+
         pack = self.get_pack(path)
-        return pack.get_file(path) if pack is not None else None
+        if pack is None:
+            resolved = self._NO_PACK
+        else:
+            resolved = (pack,) + pack.source.find_entry(path)
+        self.__cache_paths([(path, resolved)])
+        return resolved
+
+    def resolve_paths(self, paths: IterableT[str]) -> 'List[Tuple]':
+        """
+        Resolve many paths at once, hashing the paths of each pack in a
+        single batch.
+        """
+        paths = list(paths)
+        results = [self._NO_PACK] * len(paths)
+        pack_paths = OrderedDict()  # type: OrderedDict[Pack, List[int]]
+        for i, path in enumerate(paths):
+            pack = self.get_pack(path)
+            if pack is not None:
+                pack_paths.setdefault(pack, []).append(i)
+
+        for pack, positions in pack_paths.items():
+            entries = pack.source.find_entries([paths[i] for i in positions])
+            for i, entry in zip(positions, entries):
+                results[i] = (pack,) + entry
+
+        self.__cache_paths(zip(paths, results))
+        return results
+
+    def __cache_paths(self, resolved_paths):
+        with self._path_cache_lock:
+            for path, resolved in resolved_paths:
+                self._path_cache[path] = resolved
+                self._path_cache.move_to_end(path)
+            while len(self._path_cache) > self._path_cache_size:
+                self._path_cache.popitem(last=False)
 
     def get_pack(self, id_or_path):
+        if self.data_directory is None:
+            return None
         if isinstance(id_or_path, PackIdentifier):
             _id = id_or_path
         else:
@@ -147,7 +675,41 @@ class PackCollection(object):
         if _id is None:
             return None
 
-        return self._packs.get_or_add(_id, lambda i: Pack(self.data_directory, _id, self))
+        pack = self._packs.get(_id, None)
+        if pack is None:
+            pack = self._packs.get_or_add(_id, lambda i: Pack(self.data_directory, _id, self))
+        return pack
+
+    def get_all_packs(self) -> 'List[Pack]':
+        """
+        Get every pack that has an index file in the data directory.
+        """
+        ids = set()
+        if self.data_directory is None:
+            return []
+        for expansion, expansion_key in PackIdentifier.EXPANSION_TO_KEY_MAP.items():
+            expansion_directory = self.data_directory.joinpath(expansion)
+            if not expansion_directory.is_dir():
+                continue
+            for index_path in expansion_directory.glob('*.win32.index*'):
+                try:
+                    type_key = int(index_path.name[0:2], 16)
+                    number = int(index_path.name[4:6], 16)
+                except ValueError:
+                    continue
+                if type_key in PackIdentifier.KEY_TO_TYPE_MAP and \
+                        index_path.name[2:4] == '%02x' % expansion_key:
+                    ids.add(PackIdentifier(type_key, expansion_key, number))
+        return [self.get_pack(_id) for _id in sorted(ids, key=hash)]
+
+    def close(self):
+        """
+        Close the dat file handles held by every pack, and the overlays.
+        """
+        for pack in self.packs:
+            pack.close()
+        for overlay in self._overlays:
+            overlay.close()
 
 
 class Pack(Iterable):
@@ -170,6 +732,32 @@ class Pack(Iterable):
     @property
     def source(self): return self._source
 
+    @property
+    def handle_pool(self) -> DataHandlePool: return self._handle_pool
+
+    @property
+    def data_cache(self) -> DataCache: return self._data_cache
+
+    @property
+    def file_cache(self) -> FileCache:
+        """
+        Cache of the file objects handed out by this pack.
+        """
+        return self._file_cache
+
+    @property
+    def spill_cache(self) -> SpillCache:
+        return self.collection.spill_cache if self.collection is not None else None
+
+    @property
+    def name_dictionary(self) -> 'NameDictionary':
+        if self._name_dictionary is None and self.collection is not None:
+            return self.collection.name_dictionary
+        return self._name_dictionary
+
+    @name_dictionary.setter
+    def name_dictionary(self, value): self._name_dictionary = value
+
     @property
     def keep_in_memory(self): return self._keep_in_memory
 
@@ -178,13 +766,43 @@ class Pack(Iterable):
         if value == self.keep_in_memory:
             return
 
-        if len(self._data_streams) > 0:
-            logger.error("Failed to keep pack %r in memory." % self.id)
+        self._keep_in_memory = value
+        if value:
+            self._handle_pool.close()
+        else:
+            self._buffers.clear()
+            self._views.clear()
+
+    @property
+    def use_mmap(self):
+        """
+        Whether the dat files are memory-mapped.
+
+        Mapped dat files are opened once per pack, and reads return zero-copy
+        slices of the mapping instead of new bytes objects.
+        """
+        return self._use_mmap
+
+    @use_mmap.setter
+    def use_mmap(self, value):
+        if value == self.use_mmap:
             return
 
-        self._keep_in_memory = value
+        self._use_mmap = value
         if not value:
-            self._buffers.clear()
+            # Mappings are released once the last slice handed out is gone.
+            self._views.clear()
+
+    @property
+    def parallel_inflate_threshold(self) -> int:
+        """
+        Minimum size of a file for its blocks to be inflated in parallel,
+        or None to always inflate them one after another.
+        """
+        return self._parallel_inflate_threshold
+
+    @parallel_inflate_threshold.setter
+    def parallel_inflate_threshold(self, value): self._parallel_inflate_threshold = value
 
     def __init__(self,
                  data_directory,
@@ -204,46 +822,199 @@ class Pack(Iterable):
         self._collection = collection
         self._data_directory = data_directory
         self._id = id
-        self._data_streams = {}  # type: Dict[Tuple[int, int], IO]
-        self._data_streams_lock = Lock()
+        if collection is not None:
+            self._handle_pool = DataHandlePool(collection.max_open_handles, collection.handle_idle_timeout)
+            self._data_cache = collection.data_cache
+        else:
+            self._handle_pool = DataHandlePool()
+            self._data_cache = DataCache()
+        self._dat_paths = {}  # type: Dict[int, str]
+        self._views_lock = Lock()
         self._keep_in_memory = False
         self._buffers = {}  # type: Dict[int, bytes]
+        self._use_mmap = collection.use_mmap if collection is not None else False
+        self._views = {}  # type: Dict[int, memoryview]
+        self._parallel_inflate_threshold = \
+            collection.parallel_inflate_threshold if collection is not None else None
+        self._name_dictionary = None
+        self._spans = []  # type: List[Tuple[int, int, int, memoryview]]
+        self._entry_offsets = {}  # type: Dict[int, array]
+        self._scans = 0
+        self._file_cache = FileCache()
 
         index_path = data_directory.joinpath(id.expansion, self._INDEX_FILE_FORMAT.format(id.type_key, id.expansion_key, id.number))
         index2_path = data_directory.joinpath(id.expansion, self._INDEX2_FILE_FORMAT.format(id.type_key, id.expansion_key, id.number))
+        index_cache = collection.index_cache if collection is not None else None
         if index_path.exists() and index_path.is_file():
-            self._source = IndexSource(self, Index(id, index_path.as_posix()))
+            self._source = IndexSource(self, Index(id, index_path.as_posix(), index_cache))
         elif index2_path.exists() and index2_path.is_file():
-            self._source = Index2Source(self, Index2(id, index2_path.as_posix()))
+            self._source = Index2Source(self, Index2(id, index2_path.as_posix(), index_cache))
         else:
             raise FileNotFoundError
 
-    def get_data_stream(self, dat_file=0) -> IO:
-        thread = threading.get_ident()
+    def _get_dat_path(self, dat_file) -> Path:
+        base_name = self._DAT_FILE_FORMAT.format(self.id.type_key, self.id.expansion_key, self.id.number, dat_file)
+        return self.data_directory.joinpath(self.id.expansion, base_name)
 
-        key = (thread, dat_file)
-        with self._data_streams_lock:
-            stream = self._data_streams.get(key, None)
+    def get_data_view(self, dat_file=0) -> memoryview:
+        """
+        Get a view over the whole contents of a dat file.
 
-        if stream is not None:
-            return stream
+        The view is backed by a memory map, or by the in-memory buffer if the
+        pack is kept in memory.
+        """
+        view = self._views.get(dat_file, None)
+        if view is not None:
+            return view
 
-        base_name = self._DAT_FILE_FORMAT.format(self.id.type_key, self.id.expansion_key, self.id.number, dat_file)
-        full_path = self.data_directory.joinpath(self.id.expansion, base_name)
+        with self._views_lock:
+            view = self._views.get(dat_file, None)
+            if view is not None:
+                return view
 
-        if self.keep_in_memory:
-            if dat_file not in self._buffers:
-                logger.info('Reading: %s' % full_path)
-                self._buffers[dat_file] = full_path.read_bytes()
-            stream = io.BufferedReader(self._buffers[dat_file])
+            full_path = self._get_dat_path(dat_file)
+            if self.keep_in_memory:
+                if dat_file not in self._buffers:
+                    logger.info('Reading: %s' % full_path)
+                    self._buffers[dat_file] = full_path.read_bytes()
+                view = memoryview(self._buffers[dat_file])
+            else:
+                logger.info('Mapping: %s' % full_path)
+                with full_path.open(mode='rb') as f:
+                    view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+                if self._scans > 0:
+                    self._advise_view(view, 0, len(view), 'SEQUENTIAL')
+            self._views[dat_file] = view
+
+        return view
+
+    def read_data(self, dat_file: int, offset: int, length: int):
+        """
+        Read `length` bytes, starting at `offset`, from a dat file.
+
+        If the pack is memory-mapped or kept in memory the result is a slice
+        of the dat file's view; otherwise it's a newly read bytes object.
+        """
+        if self.use_mmap or self.keep_in_memory:
+            return self.get_data_view(dat_file)[offset:offset + length]
+
+        if self._spans:
+            for span_dat_file, start, end, view in tuple(self._spans):
+                if span_dat_file == dat_file and start <= offset and offset + length <= end:
+                    return bytes(view[offset - start:offset - start + length])
+
+        return self._handle_pool.read(self._get_dat_path_str(dat_file), offset, length)
+
+    def _get_dat_path_str(self, dat_file: int) -> str:
+        path = self._dat_paths.get(dat_file, None)
+        if path is None:
+            path = self._dat_paths[dat_file] = str(self._get_dat_path(dat_file))
+        return path
+
+    def will_need(self, dat_file: int, offset: int, length: int):
+        """
+        Hint that a range of a dat file will be read soon.
+
+        Nothing is done for packs kept in memory, or where the OS doesn't
+        take such hints.
+        """
+        if self.keep_in_memory or length <= 0:
+            return
+        if self.use_mmap:
+            self._advise_view(self.get_data_view(dat_file), offset, length, 'WILLNEED')
         else:
-            logger.info('Opening: %s' % full_path)
-            stream = full_path.open(mode='rb')
+            self._handle_pool.will_need(self._get_dat_path_str(dat_file), offset, length)
+
+    @contextmanager
+    def scan(self):
+        """
+        Hint that the dat files are about to be read mostly in increasing
+        offset order, until the last active scan ends.
+        """
+        with self._views_lock:
+            self._scans += 1
+            if self._scans == 1:
+                for view in self._views.values():
+                    self._advise_view(view, 0, len(view), 'SEQUENTIAL')
+        self._handle_pool.begin_scan()
+        try:
+            yield
+        finally:
+            self._handle_pool.end_scan()
+            with self._views_lock:
+                self._scans -= 1
+                if self._scans == 0:
+                    for view in self._views.values():
+                        self._advise_view(view, 0, len(view), 'NORMAL')
+
+    @staticmethod
+    def _advise_view(view: memoryview, offset: int, length: int, advice: str):
+        # Only mappings take hints, from an offset aligned to a page.
+        if not isinstance(view.obj, mmap.mmap) or not hasattr(mmap, 'MADV_' + advice):
+            return
+        start = offset - offset % mmap.PAGESIZE
+        length = min(offset + length, len(view)) - start
+        if length > 0:
+            try:
+                view.obj.madvise(getattr(mmap, 'MADV_' + advice), start, length)
+            except (OSError, ValueError):
+                pass
+
+    @contextmanager
+    def prefetch(self, dat_file: int, offset: int, buffer: bytes):
+        """
+        Serve reads of a range of a dat file from an already read buffer.
 
-        with self._data_streams_lock:
-            self._data_streams[key] = stream
+        While the context is active, calls to `read_data` that fall entirely
+        inside the buffer are answered from it instead of the dat file.
+        """
+        span = (dat_file, offset, offset + len(buffer), memoryview(buffer))
+        with self._views_lock:
+            self._spans.append(span)
+        try:
+            yield
+        finally:
+            with self._views_lock:
+                # Compare by identity; comparing views would compare their contents.
+                self._spans = [s for s in self._spans if s is not span]
 
-        return stream
+    def get_entry_end(self, dat_file: int, offset: int) -> int:
+        """
+        Get the dat offset at which the entry stored at `offset` ends.
+
+        Entries are stored one after another, so this is the offset of the
+        next entry in the dat file, or the end of the file for the last one.
+        """
+        offsets = self._entry_offsets.get(dat_file, None)
+        if offsets is None:
+            table = self.source.index.table
+            offsets = array('Q', sorted(set(o for d, o in zip(table.dat_files, table.offsets) if d == dat_file)))
+            self._entry_offsets[dat_file] = offsets
+        i = bisect_right(offsets, offset)
+        if i < len(offsets):
+            return offsets[i]
+        return os.path.getsize(self._get_dat_path(dat_file))
+
+    def get_data_stream(self, dat_file=0) -> IO:
+        """
+        Open a new stream over a dat file.
+
+        The stream is owned, and must be closed, by the caller. Reads done by
+        the library itself go through `read_data` instead.
+        """
+        full_path = self._get_dat_path(dat_file)
+
+        if self.keep_in_memory:
+            return io.BytesIO(self.get_data_view(dat_file).obj)
+
+        logger.info('Opening: %s' % full_path)
+        return full_path.open(mode='rb')
+
+    def close(self):
+        """
+        Close the dat file handles held by this pack.
+        """
+        self._handle_pool.close()
 
     def __str__(self):
         return "%s/%02x%02x%02x" % (self.id.expansion, self.id.type_key, self.id.expansion_key, self.id.number)
@@ -254,5 +1025,8 @@ class Pack(Iterable):
     def get_file(self, path):
         return self.source.get_file(path)
 
+    def get_file_from_keys(self, directory_key, file_key):
+        return self.source.get_file_from_keys(directory_key, file_key)
+
     def __iter__(self):
         return iter(self.source)
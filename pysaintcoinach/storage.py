@@ -0,0 +1,182 @@
+from abc import ABC, abstractmethod
+from pathlib import Path
+from threading import Lock
+from typing import Callable, Dict, Optional, Union
+import io
+import logging
+
+from .file import File
+
+
+logger = logging.getLogger(__name__)
+
+Loader = Callable[[int, int], bytes]
+
+
+class StorageBackend(ABC):
+    """
+    Source of game files, looked up by their path.
+
+    `PackCollection` reads the game's SqPack files and consults the backends
+    it's given before its own packs, so files they hold take precedence.
+    """
+
+    @abstractmethod
+    def file_exists(self, path: str) -> bool:
+        pass
+
+    @abstractmethod
+    def get_file(self, path: str) -> Optional[File]:
+        pass
+
+    def close(self):
+        pass
+
+
+class LooseFile(File):
+    """
+    File stored already decompressed, outside of any pack.
+    """
+
+    @property
+    def storage(self) -> StorageBackend: return self._storage
+
+    @property
+    def index(self): return None
+
+    @property
+    def path(self): return self._path
+
+    @path.setter
+    def path(self, value): self._path = value
+
+    def __init__(self, storage: StorageBackend, path: str, loader: Loader):
+        File.__init__(self, None, None)
+        self._storage = storage
+        self._path = path
+        self._loader = loader
+        self._data = None
+
+    def get_data(self):
+        """
+        Get the data of the file, which is read once and kept by this object.
+        """
+        if self._data is None:
+            logger.info('Getting data for: %s' % self.path)
+            self._data = self._read()
+        return self._data
+
+    def pin(self):
+        pass
+
+    def unpin(self):
+        pass
+
+    def _get_cache_key(self):
+        return self.storage, self.path
+
+    def _read(self):
+        return self._loader(0, -1)
+
+    def open(self, cached_blocks: int = None):
+        return io.BytesIO(self.get_data())
+
+
+def create_loose_file(storage: StorageBackend, path: str, loader: Loader) -> LooseFile:
+    """
+    Create the file object for loose data, which for textures (`*.tex`)
+    starts with the image header.
+    """
+    if path.lower().endswith('.tex'):
+        # Import here to prevent mutual dependency.
+        from .imaging import LooseImageFile
+        return LooseImageFile(storage, path, loader)
+    return LooseFile(storage, path, loader)
+
+
+class LooseFileStorage(StorageBackend):
+    """
+    Directory of files extracted from the packs, laid out by their paths.
+
+    The directory is listed once, on first use, so that paths can be matched
+    without regard to case as they are in the packs; call `refresh` after
+    adding or removing files.
+    """
+
+    @property
+    def directory(self) -> Path: return self._directory
+
+    def __init__(self, directory: Union[str, Path]):
+        directory = Path(directory)
+        if not directory.is_dir():
+            raise FileNotFoundError
+        self._directory = directory
+        self._paths = None  # type: Dict[str, Path]
+        self._lock = Lock()
+
+    def refresh(self):
+        with self._lock:
+            self._paths = None
+
+    def __get_paths(self) -> Dict[str, Path]:
+        paths = self._paths
+        if paths is None:
+            with self._lock:
+                if self._paths is None:
+                    logger.info('Listing: %s' % self.directory)
+                    self._paths = {p.relative_to(self.directory).as_posix().lower(): p
+                                   for p in self.directory.rglob('*') if p.is_file()}
+                paths = self._paths
+        return paths
+
+    def file_exists(self, path: str) -> bool:
+        return path.lower() in self.__get_paths()
+
+    def get_file(self, path: str) -> Optional[File]:
+        full_path = self.__get_paths().get(path.lower(), None)
+        if full_path is None:
+            return None
+
+        def load(offset, length):
+            with full_path.open(mode='rb') as f:
+                f.seek(offset)
+                return f.read(length)
+
+        return create_loose_file(self, path, load)
+
+
+class MemoryStorage(StorageBackend):
+    """
+    Files held in memory, by path; intended for tests and benchmarks that
+    shouldn't need a game installation.
+    """
+
+    def __init__(self, files: Dict[str, bytes] = None):
+        self._files = {}  # type: Dict[str, bytes]
+        if files is not None:
+            for path, data in files.items():
+                self.add(path, data)
+
+    def __len__(self):
+        return len(self._files)
+
+    def add(self, path: str, data: bytes):
+        self._files[path.lower()] = bytes(data)
+
+    def remove(self, path: str):
+        self._files.pop(path.lower(), None)
+
+    def file_exists(self, path: str) -> bool:
+        return path.lower() in self._files
+
+    def get_file(self, path: str) -> Optional[File]:
+        data = self._files.get(path.lower(), None)
+        if data is None:
+            return None
+
+        def load(offset, length):
+            if offset == 0 and length < 0:
+                return data
+            return data[offset:offset + length if length >= 0 else len(data)]
+
+        return create_loose_file(self, path, load)
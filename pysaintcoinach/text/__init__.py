@@ -69,6 +69,60 @@ class XivString(IExpressionNode, INodeWithChildren):
         return visitor.visit(self)
 
 
+class LazyXivString(XivString):
+    """
+    String kept as the bytes it was read from, and only decoded once it is
+    rendered or its nodes are inspected.
+    """
+
+    @property
+    def raw(self) -> bytes: return self.__raw
+
+    @property
+    def children(self):
+        if self.__children is None:
+            if XivStringDecoder.TAG_START_MARKER in self.__raw:
+                self.__children = XivStringDecoder.default().decode(self.__raw).children
+            elif len(self.__raw) == 0:
+                self.__children = []
+            else:
+                self.__children = [nodes.StaticString(str(self))]
+        return self.__children
+
+    @property
+    def is_empty(self) -> bool:
+        return len(self.__raw) == 0 or len(str(self).strip()) != 0
+
+    def __init__(self, raw: bytes):
+        self.__raw = raw
+        self.__children = None
+        self.__string = None
+
+    def __str__(self):
+        if self.__string is None:
+            self.__string = decode_string(self.__raw)
+        return self.__string
+
+    def __repr__(self):
+        return "LazyXivString(%r)" % self.__raw
+
+    def __len__(self):
+        return len(str(self))
+
+    def __format__(self, format_spec):
+        return format(str(self), format_spec)
+
+
+def decode_string(raw: bytes) -> str:
+    """
+    Decode the bytes of a string to its text, decoding tags only if it has
+    any.
+    """
+    if XivStringDecoder.TAG_START_MARKER in raw:
+        return str(XivStringDecoder.default().decode(raw))
+    return raw.decode()
+
+
 def _read_byte(stream: io.BytesIO) -> int:
     return struct.unpack_from('B', stream.read(1))[0]
 
@@ -178,8 +232,8 @@ class XivStringDecoder(object):
     def set_decoder(self, tag: TagType, decoder: TagDecoder):
         self.__tag_decoders[tag] = decoder
 
-    def decode(self, buffer: Union[bytes, io.BytesIO], length: int = None) -> XivString:
-        if isinstance(buffer, bytes):
+    def decode(self, buffer: Union[bytes, bytearray, memoryview, io.BytesIO], length: int = None) -> XivString:
+        if isinstance(buffer, (bytes, bytearray, memoryview)):
             input = io.BytesIO(buffer)
             length = len(buffer)
         else:
@@ -1,5 +1,7 @@
-from typing import Union, Callable, TypeVar, Dict
+from typing import Union, Callable, TypeVar, Dict, Generic, Iterator
+from collections.abc import Mapping
 from inspect import isfunction
+from threading import Condition, Lock, get_ident
 
 
 TKey = TypeVar('TKey')
@@ -35,3 +37,87 @@ class ConcurrentDictionary(dict, Dict[TKey, TValue]):
             value = self[key]
 
         return value
+
+
+class _Flight(object):
+    __slots__ = ('owner', 'value', 'error')
+
+    def __init__(self):
+        self.owner = get_ident()
+        self.value = None
+        self.error = None
+
+
+class ConcurrentCache(Mapping, Generic[TKey, TValue]):
+    """
+    Read-only mapping whose values are created on first use by `get_or_add`.
+
+    Only one thread creates the value of a key; others asking for it in the
+    meantime wait for that value rather than creating their own. If creation
+    fails, every waiting thread raises a new error of the same type, chained
+    from the original, and the key is left absent, so that a later call
+    tries again.
+    """
+
+    def __init__(self):
+        self._values = {}  # type: Dict[TKey, TValue]
+        self._flights = {}  # type: Dict[TKey, _Flight]
+        self._lock = Lock()
+        self._done = Condition(self._lock)
+
+    def __getitem__(self, key: TKey) -> TValue:
+        return self._values[key]
+
+    def __contains__(self, key) -> bool:
+        return key in self._values
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __iter__(self) -> Iterator[TKey]:
+        return iter(list(self._values))
+
+    def get_or_add(self, key: TKey, factory: Callable[[TKey], TValue]) -> TValue:
+        try:
+            return self._values[key]
+        except KeyError:
+            pass
+
+        with self._lock:
+            if key in self._values:
+                return self._values[key]
+            flight = self._flights.get(key, None)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+            elif flight.owner != get_ident():
+                while self._flights.get(key, None) is flight:
+                    self._done.wait()
+                if flight.error is not None:
+                    raise _copy_error(flight.error) from flight.error
+                return flight.value
+            else:
+                # Asked for again while creating it; waiting would never end.
+                flight = None
+        if flight is None:
+            return factory(key)
+
+        try:
+            flight.value = factory(key)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if flight.error is None:
+                    self._values[key] = flight.value
+                del self._flights[key]
+                self._done.notify_all()
+        return flight.value
+
+
+def _copy_error(error: BaseException) -> BaseException:
+    # A new error of the same type, so that waiters can still catch it by type.
+    try:
+        return type(error)(*error.args)
+    except Exception:
+        return RuntimeError(str(error))
@@ -18,7 +18,7 @@ from ..ex.relational.sheet import IRelationalRow, IRelationalSheet
 from .. import xiv
 from .. import text
 from .. import imaging
-from ..util import ConcurrentDictionary
+from ..util import ConcurrentCache
 
 
 class IXivRow(IRelationalRow):
@@ -183,7 +183,7 @@ class XivSheet(IXivSheet[T]):
         self, t_cls: Type[T], collection: "xiv.XivCollection", source: IRelationalSheet
     ):
         self.__t_cls = t_cls
-        self.__rows = ConcurrentDictionary()  # type: ConcurrentDictionary[int, T]
+        self.__rows = ConcurrentCache()  # type: ConcurrentCache[int, T]
         self.__collection = collection
         self.__source = source
 
@@ -235,6 +235,13 @@ class XivSheet(IXivSheet[T]):
     def keys(self):
         return self.__source.keys
 
+    def to_columns(self, columns=None, as_numpy: bool = None):
+        """
+        Decode columns of every row at once; see `DataSheet.to_columns`.
+        Values are not converted to linked rows or other objects.
+        """
+        return self.__source.to_columns(columns, as_numpy)
+
 
 class XivSubRow(XivRow, IXivSubRow):
     def __init__(self, sheet: IXivSheet, source_row: IRelationalRow):